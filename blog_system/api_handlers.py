@@ -1,9 +1,10 @@
 import json
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from http_types import HTTPRequest, HTTPResponse
 from auth import AuthService
+from database import keyset_cursor
 from models.post import PostModel
 from models.comment import CommentModel
 from models.interaction import InteractionModel
@@ -25,9 +26,28 @@ HTTP_STATUS_MESSAGES = {
     500: "Internal Server Error",
 }
 
+# 消息类接口每页默认条数
+_MESSAGE_PAGE_SIZE = 50
+
+
+class RawJSON(str):
+    # 已在别处（如 SQLite json_group_array）序列化好的 JSON 文本，json_response 原样嵌入
+    pass
+
+
+def _dump_json(data: Any) -> str:
+    if isinstance(data, dict) and any(isinstance(value, RawJSON) for value in data.values()):
+        fields = (
+            f"{json.dumps(key, ensure_ascii=False)}: "
+            f"{value if isinstance(value, RawJSON) else json.dumps(value, ensure_ascii=False)}"
+            for key, value in data.items()
+        )
+        return "{" + ", ".join(fields) + "}"
+    return json.dumps(data, ensure_ascii=False)
+
 
 def json_response(data: Any, status: int = 200) -> HTTPResponse:
-    body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    body = _dump_json(data).encode("utf-8")
     headers = {
         "Content-Type": "application/json; charset=utf-8",
         "Content-Length": str(len(body)),
@@ -48,6 +68,17 @@ class BaseAPI:
     def _get_user(self, request: HTTPRequest) -> Optional[Dict[str, Any]]:
         return self.auth_service.get_current_user(request)
 
+    def _safe_int(self, value: Optional[str], default: int, minimum: int = 0, maximum: Optional[int] = None) -> int:
+        try:
+            parsed = int(value) if value is not None else default
+        except ValueError:
+            parsed = default
+        if parsed < minimum:
+            parsed = minimum
+        if maximum is not None and parsed > maximum:
+            parsed = maximum
+        return parsed
+
 
 class PostAPI(BaseAPI):
     def __init__(
@@ -66,19 +97,26 @@ class PostAPI(BaseAPI):
         user = self._get_user(request)
         query = request.get_query_params()
         filters: Dict[str, Any] = {}
-        for key in ("keyword", "category", "author", "permission_type"):
+        for key in ("keyword", "category", "author", "permission_type", "tag"):
             value = query.get(key)
             if value:
                 filters[key] = value
         limit = self._safe_int(query.get("limit"), default=50, minimum=1, maximum=200)
-        offset = self._safe_int(query.get("offset"), default=0, minimum=0)
-        posts = self.posts.list_posts(limit=limit, offset=offset, filters=filters)
+        next_before: Optional[str] = None
+        if query.get("offset") is not None:
+            # 兼容旧的 offset 分页参数
+            offset = self._safe_int(query.get("offset"), default=0, minimum=0)
+            posts = self.posts.list_posts(limit=limit, offset=offset, filters=filters, viewer=user, visible_only=True)
+        else:
+            posts, next_before = self.posts.list_posts_keyset(
+                limit=limit, before=query.get("before") or None, filters=filters, viewer=user, visible_only=True
+            )
         cookies = request.get_cookies()
         payload: List[Dict[str, Any]] = []
         for post in posts:
             if self._post_accessible(post, user, cookies):
                 payload.append(self._serialize_post_summary(post))
-        return json_response({"success": True, "posts": payload})
+        return json_response({"success": True, "posts": payload, "next_before": next_before})
 
     def get_post(self, request: HTTPRequest, post_id: str) -> HTTPResponse:
         user = self._get_user(request)
@@ -257,17 +295,6 @@ class PostAPI(BaseAPI):
             has_password_access = cookies.get(cookie_key) == "granted"
         return self.posts.can_view_post(post, user, has_password_access)
 
-    def _safe_int(self, value: Optional[str], default: int, minimum: int = 0, maximum: Optional[int] = None) -> int:
-        try:
-            parsed = int(value) if value is not None else default
-        except ValueError:
-            parsed = default
-        if parsed < minimum:
-            parsed = minimum
-        if maximum is not None and parsed > maximum:
-            parsed = maximum
-        return parsed
-
 
 class CommentAPI(BaseAPI):
     def __init__(self, auth_service: AuthService, post_model: PostModel, comment_model: CommentModel) -> None:
@@ -383,10 +410,9 @@ class MessageAPI(BaseAPI):
         user = self._get_user(request)
         if not user:
             return error_response("请先登录", status=401)
-        conversations = self.messages.list_conversations(user["id"])
-        for item in conversations:
-            item["created_at"] = self._format_timestamp(item.get("created_at"))
-        return json_response({"success": True, "messages": conversations})
+        limit, before = self._page_arguments(request)
+        conversations, next_before = self.messages.list_conversations_json(user["id"], limit=limit, before=before)
+        return json_response({"success": True, "messages": RawJSON(conversations), "next_before": next_before})
 
     def get_conversation(self, request: HTTPRequest, target_username: str) -> HTTPResponse:
         user = self._get_user(request)
@@ -395,10 +421,32 @@ class MessageAPI(BaseAPI):
         target = self.users.get_user_by_username(target_username)
         if target is None:
             return error_response("用户不存在", status=404)
-        conversation = self.messages.list_messages_between(user["id"], target["id"])
-        for item in conversation:
-            item["created_at"] = self._format_timestamp(item.get("created_at"))
-        return json_response({"success": True, "conversation": conversation, "current_user_id": user["id"]})
+        # 对话页每 3 秒整体刷新，前端不分页：未指定 limit 时返回全部消息
+        limit, before = self._page_arguments(request, default_limit=None)
+        conversation, next_before = self.messages.list_messages_between_json(
+            user["id"], target["id"], limit=limit, before=before
+        )
+        return json_response(
+            {
+                "success": True,
+                "conversation": RawJSON(conversation),
+                "current_user_id": user["id"],
+                "next_before": next_before,
+            }
+        )
+
+    def _page_arguments(
+        self, request: HTTPRequest, default_limit: Optional[int] = _MESSAGE_PAGE_SIZE
+    ) -> Tuple[Optional[int], Optional[str]]:
+        # 消息列表按 (created_at, id) 键集分页：before 为上一页响应中的 next_before。
+        # default_limit 为 None 且请求未带 limit 时不限条数
+        query = request.get_query_params()
+        if query.get("limit") is None and default_limit is None:
+            return None, query.get("before") or None
+        limit = self._safe_int(
+            query.get("limit"), default=default_limit or _MESSAGE_PAGE_SIZE, minimum=1, maximum=200
+        )
+        return limit, query.get("before") or None
 
     def send_message(self, request: HTTPRequest) -> HTTPResponse:
         user = self._get_user(request)
@@ -421,19 +469,23 @@ class MessageAPI(BaseAPI):
         user = self._get_user(request)
         if not user:
             return error_response("请先登录", status=401)
-        messages = self.messages.get_inbox_messages(user["id"])
+        limit, before = self._page_arguments(request)
+        messages = self.messages.get_inbox_messages(user["id"], limit=limit, before=before)
+        next_before = keyset_cursor(messages[-1]["created_at"], messages[-1]["id"]) if len(messages) >= limit else None
         for item in messages:
             item["created_at"] = self._format_timestamp(item.get("created_at"))
-        return json_response({"success": True, "messages": messages})
+        return json_response({"success": True, "messages": messages, "next_before": next_before})
 
     def get_sent(self, request: HTTPRequest) -> HTTPResponse:
         user = self._get_user(request)
         if not user:
             return error_response("请先登录", status=401)
-        messages = self.messages.get_sent_messages(user["id"])
+        limit, before = self._page_arguments(request)
+        messages = self.messages.get_sent_messages(user["id"], limit=limit, before=before)
+        next_before = keyset_cursor(messages[-1]["created_at"], messages[-1]["id"]) if len(messages) >= limit else None
         for item in messages:
             item["created_at"] = self._format_timestamp(item.get("created_at"))
-        return json_response({"success": True, "messages": messages})
+        return json_response({"success": True, "messages": messages, "next_before": next_before})
 
     def get_trash(self, request: HTTPRequest) -> HTTPResponse:
         user = self._get_user(request)
@@ -508,17 +560,6 @@ class PerformanceAPI(BaseAPI):
             return error_response("性能数据格式不正确", status=422)
         self.metrics.record_metric(latency, throughput, rtt, request_count)
         return json_response({"success": True}, status=201)
-
-    def _safe_int(self, value: Optional[str], default: int, minimum: int = 0, maximum: Optional[int] = None) -> int:
-        try:
-            parsed = int(value) if value is not None else default
-        except ValueError:
-            parsed = default
-        if parsed < minimum:
-            parsed = minimum
-        if maximum is not None and parsed > maximum:
-            parsed = maximum
-        return parsed
     
 class PokemonAPI(BaseAPI):
     def __init__(self, auth_service: AuthService, pokemon_model: PokemonModel) -> None:
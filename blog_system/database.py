@@ -1,13 +1,45 @@
+import json
 import os
+import queue
 import sqlite3
 import threading
-from typing import Callable, Iterable, Optional, Any, Dict
+import urllib.parse
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, List, Optional, Any, Dict, Tuple
+
+
+# 连接缓存的预编译语句数量（sqlite3 默认 128）
+_CACHED_STATEMENTS = 512
+
+# 连接级 PRAGMA；journal_mode=WAL 持久化在文件里，在建表时设置
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+# 只读连接池常驻连接数；池空时临时多开一个，用完若池已满则关闭，嵌套读取不会互相等待
+_READ_POOL_SIZE = max(4, os.cpu_count() or 1)
+
+
+def _convert_boolean(value: bytes) -> bool:
+    return value != b"0"
+
+
+# 查询里写成 col AS "name [BOOLEAN]" 的列由 sqlite3 直接转换为 bool（连接开启 PARSE_COLNAMES）
+sqlite3.register_converter("BOOLEAN", _convert_boolean)
 
 
 class Database:
     def __init__(self, db_path: str) -> None:
         self.db_path = db_path
         self.lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=_READ_POOL_SIZE)
         self._ensure_directory()
         self._initialize_schema()
 
@@ -19,6 +51,8 @@ class Database:
     def _initialize_schema(self) -> None:
         with self.get_connection() as connection:
             cursor = connection.cursor()
+            # WAL 模式持久化在数据库文件中：写入（如计数器自增）不再阻塞并发读取
+            cursor.execute("PRAGMA journal_mode=WAL")
             cursor.execute(
                 """
                 CREATE TABLE IF NOT EXISTS users (
@@ -82,7 +116,7 @@ class Database:
             cursor.execute(
                 """
                 CREATE TABLE IF NOT EXISTS likes (
-                    id TEXT PRIMARY KEY,
+                    id BLOB PRIMARY KEY,
                     post_id TEXT NOT NULL,
                     user_id INTEGER NOT NULL,
                     created_at TEXT NOT NULL,
@@ -94,7 +128,7 @@ class Database:
             cursor.execute(
                 """
                 CREATE TABLE IF NOT EXISTS favorites (
-                    id TEXT PRIMARY KEY,
+                    id BLOB PRIMARY KEY,
                     post_id TEXT NOT NULL,
                     user_id INTEGER NOT NULL,
                     created_at TEXT NOT NULL,
@@ -165,9 +199,26 @@ class Database:
                 )
                 """
             )
+            # 列表页按作者/分类/权限筛选后按时间倒序，复合索引可直接按序扫描，免去临时排序
+            cursor.execute("DROP INDEX IF EXISTS idx_posts_author")
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_posts_author_created ON posts(author_id, created_at DESC)
+                """
+            )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_posts_category ON posts(category, created_at DESC)
+                """
+            )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_posts_permission ON posts(permission_type, created_at DESC)
+                """
+            )
             cursor.execute(
                 """
-                CREATE INDEX IF NOT EXISTS idx_posts_author ON posts(author_id)
+                CREATE INDEX IF NOT EXISTS idx_posts_created ON posts(created_at DESC)
                 """
             )
             cursor.execute(
@@ -185,9 +236,62 @@ class Database:
                 CREATE INDEX IF NOT EXISTS idx_favorites_post_user ON favorites(post_id, user_id)
                 """
             )
+            # 点赞/收藏按 (user_id, post_id) 唯一，先清理历史重复记录再建唯一索引
+            for table in ("likes", "favorites"):
+                cursor.execute(
+                    f"""
+                    DELETE FROM {table} WHERE rowid NOT IN (
+                        SELECT MIN(rowid) FROM {table} GROUP BY user_id, post_id
+                    )
+                    """
+                )
+                cursor.execute(
+                    f"""
+                    CREATE UNIQUE INDEX IF NOT EXISTS ux_{table}_user_post ON {table}(user_id, post_id)
+                    """
+                )
+            # 同一用户对同一对象只保留一条订阅，唯一索引让 add_subscription 可以直接 INSERT OR IGNORE
+            cursor.execute(
+                """
+                DELETE FROM subscriptions WHERE rowid NOT IN (
+                    SELECT MIN(rowid) FROM subscriptions GROUP BY user_id, subscription_type, subscription_value
+                )
+                """
+            )
+            cursor.execute(
+                """
+                CREATE UNIQUE INDEX IF NOT EXISTS ux_subscriptions_user_value
+                ON subscriptions(user_id, subscription_type, subscription_value)
+                """
+            )
+            # 订阅列表按 (user_id, created_at DESC) 顺序读取免排序；作者订阅者查询走只含 author 类型行的部分索引，
+            # 索引内带 user_id，统计人数与通知群发都无需回表
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_subs_user_created ON subscriptions(user_id, created_at DESC)
+                """
+            )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_subs_author ON subscriptions(subscription_value, user_id)
+                WHERE subscription_type = 'author'
+                """
+            )
+            # 收件箱/发件箱/会话查询的复合索引；idx_messages_pair 覆盖了原 (sender_id, receiver_id) 索引
+            cursor.execute("DROP INDEX IF EXISTS idx_messages_users")
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_messages_receiver ON messages(receiver_id, status, created_at DESC)
+                """
+            )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_messages_sender ON messages(sender_id, status, created_at DESC)
+                """
+            )
             cursor.execute(
                 """
-                CREATE INDEX IF NOT EXISTS idx_messages_users ON messages(sender_id, receiver_id)
+                CREATE INDEX IF NOT EXISTS idx_messages_pair ON messages(sender_id, receiver_id, created_at)
                 """
             )
             # === 新增：宝可梦互动组件表 ===
@@ -204,52 +308,217 @@ class Database:
             )
             # 初始化一个全局计数器（如果不存在）
             cursor.execute("INSERT OR IGNORE INTO pokemon_interactions (id, interaction_type, count) VALUES (1, 'global_pats', 0)")
+            self._initialize_post_search(cursor)
+            self._migrate_post_tags(cursor)
             connection.commit()
 
+    def _initialize_post_search(self, cursor: sqlite3.Cursor) -> None:
+        # 标题/正文全文索引。trigram 分词支持中文等无空格文本的子串匹配（与原 LIKE '%kw%' 语义一致），
+        # 由触发器随 posts 同步；首次创建时从现有文章回填。
+        # FTS5 只能按 rowid 定位行（post_id 列不建索引），posts_fts_rowids 为每篇文章分配固定的 FTS rowid，
+        # 触发器据此按 rowid 更新/删除索引行，避免扫描整个索引
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts_rowids'"
+        ).fetchone()
+        if exists is None:
+            # 旧版本的索引行没有对应的 rowid 映射，连同按 post_id 查找的触发器一起重建
+            cursor.execute("DROP TRIGGER IF EXISTS posts_fts_insert")
+            cursor.execute("DROP TRIGGER IF EXISTS posts_fts_update")
+            cursor.execute("DROP TRIGGER IF EXISTS posts_fts_delete")
+            cursor.execute("DROP TABLE IF EXISTS posts_fts")
+            cursor.execute(
+                """
+                CREATE TABLE posts_fts_rowids (
+                    fts_rowid INTEGER PRIMARY KEY,
+                    post_id TEXT NOT NULL UNIQUE
+                )
+                """
+            )
+            cursor.execute(
+                """
+                CREATE VIRTUAL TABLE posts_fts USING fts5(
+                    post_id UNINDEXED,
+                    title,
+                    content,
+                    tokenize = 'trigram'
+                )
+                """
+            )
+            cursor.execute("INSERT INTO posts_fts_rowids (post_id) SELECT id FROM posts")
+            cursor.execute(
+                """
+                INSERT INTO posts_fts (rowid, post_id, title, content)
+                SELECT posts_fts_rowids.fts_rowid, posts.id, posts.title, posts.content
+                FROM posts
+                INNER JOIN posts_fts_rowids ON posts_fts_rowids.post_id = posts.id
+                """
+            )
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+                INSERT INTO posts_fts_rowids (post_id) VALUES (new.id);
+                INSERT INTO posts_fts (rowid, post_id, title, content)
+                VALUES (last_insert_rowid(), new.id, new.title, new.content);
+            END
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, content ON posts BEGIN
+                UPDATE posts_fts SET title = new.title, content = new.content
+                WHERE rowid = (SELECT fts_rowid FROM posts_fts_rowids WHERE post_id = old.id);
+            END
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+                DELETE FROM posts_fts WHERE rowid = (SELECT fts_rowid FROM posts_fts_rowids WHERE post_id = old.id);
+                DELETE FROM posts_fts_rowids WHERE post_id = old.id;
+            END
+            """
+        )
+
+    def _migrate_post_tags(self, cursor: sqlite3.Cursor) -> None:
+        # 标签列由逗号分隔改为 JSON 数组存储，旧数据一次性转换；已是数组的行不会被选中
+        rows = cursor.execute(
+            """
+            SELECT id, tags FROM posts
+            WHERE tags IS NOT NULL AND (json_valid(tags) = 0 OR json_type(tags) <> 'array')
+            """
+        ).fetchall()
+        cursor.executemany(
+            "UPDATE posts SET tags = ? WHERE id = ?",
+            [
+                (json.dumps(tags.split(",") if tags else [], ensure_ascii=False), post_id)
+                for post_id, tags in rows
+            ],
+        )
+
     def get_connection(self) -> sqlite3.Connection:
-        connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        # 唯一的读写连接：所有写入都在 self.lock 下串行进行，复用同一个连接，语句缓存才能跨调用命中
+        if self._connection is None:
+            self._connection = self._open_connection(self.db_path, uri=False)
+        return self._connection
+
+    def _open_connection(self, database: str, uri: bool) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            database,
+            uri=uri,
+            check_same_thread=False,
+            cached_statements=_CACHED_STATEMENTS,
+            detect_types=sqlite3.PARSE_COLNAMES,
+        )
         connection.row_factory = sqlite3.Row
+        for pragma in _CONNECTION_PRAGMAS:
+            connection.execute(pragma)
         return connection
 
-    def execute(self, query: str, parameters: Iterable[Any] = ()) -> None:
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        # WAL 模式下只读连接与写连接互不阻塞；每条 SELECT 自动提交，总能看到最近一次已提交的写入
+        try:
+            connection = self._readers.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                # 只读连接依赖写连接建好的 -wal/-shm 文件
+                self.get_connection()
+            uri = "file:" + urllib.parse.quote(os.path.abspath(self.db_path)) + "?mode=ro"
+            connection = self._open_connection(uri, uri=True)
+        try:
+            yield connection
+        finally:
+            try:
+                self._readers.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
         with self.lock:
-            with self.get_connection() as connection:
-                cursor = connection.cursor()
-                cursor.execute(query, tuple(parameters))
-                connection.commit()
+            connection = self.get_connection()
+            try:
+                yield connection
+            except BaseException:
+                connection.rollback()
+                raise
+            connection.commit()
+
+    def execute(self, query: str, parameters: Iterable[Any] = ()) -> int:
+        with self.write() as connection:
+            return connection.execute(query, tuple(parameters)).rowcount
 
     def execute_many(self, query: str, parameter_list: Iterable[Iterable[Any]]) -> None:
-        with self.lock:
-            with self.get_connection() as connection:
-                cursor = connection.cursor()
-                cursor.executemany(query, list(parameter_list))
-                connection.commit()
+        with self.write() as connection:
+            connection.executemany(query, list(parameter_list))
 
     def fetch_one(self, query: str, parameters: Iterable[Any] = ()) -> Optional[sqlite3.Row]:
-        with self.lock:
-            with self.get_connection() as connection:
-                cursor = connection.cursor()
-                cursor.execute(query, tuple(parameters))
-                return cursor.fetchone()
+        with self.read() as connection:
+            return connection.execute(query, tuple(parameters)).fetchone()
+
+    def fetch_all(
+        self,
+        query: str,
+        parameters: Iterable[Any] = (),
+        row_factory: Optional[Callable[[sqlite3.Cursor, tuple], Any]] = None,
+    ) -> Iterable[Any]:
+        with self.read() as connection:
+            cursor = connection.cursor()
+            if row_factory is not None:
+                cursor.row_factory = row_factory
+            cursor.execute(query, tuple(parameters))
+            return cursor.fetchall()
+
+    def fetch_all_dicts(self, query: str, parameters: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        # 列名只从 cursor.description 取一次，每行用 zip 直接组装成 dict，后续按键访问是哈希查找
+        with self.read() as connection:
+            cursor = connection.cursor()
+            cursor.row_factory = None
+            cursor.execute(query, tuple(parameters))
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def iter_rows(self, query: str, parameters: Iterable[Any] = (), batch_size: int = 256) -> Iterator[sqlite3.Row]:
+        # 迭代期间独占一个只读连接，分批 fetchmany；消费方在循环中读写数据库不受影响
+        with self.read() as connection:
+            cursor = connection.execute(query, tuple(parameters))
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    yield from rows
+            finally:
+                cursor.close()
 
-    def fetch_all(self, query: str, parameters: Iterable[Any] = ()) -> Iterable[sqlite3.Row]:
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        # 多条相关写入放进同一个 BEGIN IMMEDIATE 事务：一开始就拿到写锁，整组语句只提交（fsync）一次
         with self.lock:
-            with self.get_connection() as connection:
-                cursor = connection.cursor()
-                cursor.execute(query, tuple(parameters))
-                return cursor.fetchall()
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                connection.rollback()
+                raise
+            connection.commit()
 
     def transactional(self, operation: Callable[[sqlite3.Cursor], Any]) -> Any:
-        with self.lock:
-            with self.get_connection() as connection:
-                cursor = connection.cursor()
-                try:
-                    result = operation(cursor)
-                except Exception:
-                    connection.rollback()
-                    raise
-                connection.commit()
-                return result
+        with self.transaction() as cursor:
+            return operation(cursor)
+
+
+def keyset_cursor(created_at: str, row_id: Any) -> str:
+    # 按 (created_at, id) 倒序的键集分页游标；同一时间戳的多行靠 id 区分，翻页时不会跳过
+    return f"{created_at}|{row_id}"
+
+
+def split_keyset_cursor(cursor: str) -> Tuple[str, str]:
+    # 只有时间的旧游标 id 为空串：(created_at, id) < (游标时间, '') 只选出更早的行，与原语义一致
+    created_at, _, row_id = cursor.partition("|")
+    return created_at, row_id
 
 
 database_instance: Optional[Database] = None
@@ -1,10 +1,10 @@
 import os
 import html
 import re
-import uuid
 from datetime import datetime
+from functools import lru_cache, wraps
 from html.parser import HTMLParser
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, Iterator, List, Optional, Set
 from urllib.parse import quote_plus
 
 from http_types import HTTPRequest, HTTPResponse
@@ -26,6 +26,70 @@ def create_redirect(location: str) -> HTTPResponse:
     return HTTPResponse(302, "Found", b"", headers)
 
 
+# 旧实现每条订阅各查一次且各取 50 篇，合并查询时按订阅数放大上限
+_SUBSCRIPTION_POSTS_PER_VALUE = 50
+
+
+def _list_subscribed_posts(
+    post_model: PostModel,
+    subscriptions: List[Dict[str, Any]],
+    user: Dict[str, Any],
+) -> List[Dict[str, Any]]:
+    # 按订阅类型合并为至多两次 IN 查询：先分类后作者
+    category_values = [item["value"] for item in subscriptions if item["type"] == "category"]
+    author_values = [item["value"] for item in subscriptions if item["type"] != "category"]
+    posts: List[Dict[str, Any]] = []
+    if category_values:
+        posts.extend(
+            post_model.list_posts(
+                limit=_SUBSCRIPTION_POSTS_PER_VALUE * len(category_values),
+                filters={"category": category_values},
+                viewer=user,
+                visible_only=True,
+            )
+        )
+    if author_values:
+        posts.extend(
+            post_model.list_posts(
+                limit=_SUBSCRIPTION_POSTS_PER_VALUE * len(author_values),
+                filters={"author": author_values},
+                viewer=user,
+                visible_only=True,
+            )
+        )
+    return posts
+
+
+def require_user_and_post(handler: Callable[..., HTTPResponse]) -> Callable[..., HTTPResponse]:
+    # 统一处理“未登录跳转登录页、文章不存在返回 404”，并把已加载的 user/post 传给处理函数
+    @wraps(handler)
+    def wrapper(self: "ArticleHandlers", request: HTTPRequest, post_id: str) -> HTTPResponse:
+        user = self.get_current_user(request)
+        if not user:
+            return create_redirect("/login")
+        post = self.posts.get_post_by_id(post_id)
+        if post is None:
+            return self._build_not_found()
+        return handler(self, request, post_id, user=user, post=post)
+
+    return wrapper
+
+
+def _plain_text_response(status_code: int, reason: str, text: str) -> HTTPResponse:
+    body = text.encode("utf-8")
+    headers = {
+        "Content-Type": "text/plain; charset=utf-8",
+        "Content-Length": str(len(body)),
+        "Connection": "close",
+    }
+    return HTTPResponse(status_code, reason, body, headers)
+
+
+# 错误响应内容固定，导入时构造一次后共享（调用方不得修改返回的实例）
+_NOT_FOUND_RESPONSE = _plain_text_response(404, "Not Found", "未找到内容")
+_FORBIDDEN_RESPONSES: Dict[str, HTTPResponse] = {}
+
+
 class TemplateRenderer:
     RAW_KEYS = {
         "main_content",
@@ -368,6 +432,154 @@ _ALLOWED_RICH_TEXT_STYLES = {
 
 _HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
 _WHITESPACE_PATTERN = re.compile(r"\s+")
+# 纯文本转 HTML：一次遍历完成 html.escape 与换行替换
+_PLAIN_TEXT_TO_HTML = str.maketrans(
+    {
+        "&": "&amp;",
+        "<": "&lt;",
+        ">": "&gt;",
+        '"': "&quot;",
+        "'": "&#x27;",
+        "\n": "<br>",
+    }
+)
+
+
+def _plain_text_to_html(text: str) -> str:
+    return text.translate(_PLAIN_TEXT_TO_HTML)
+
+
+# 列表渲染热路径的转义：安装了 markupsafe 时使用其 C 实现（单次扫描），否则回退到 html.escape
+try:
+    from markupsafe import escape as _markupsafe_escape
+except ImportError:
+    _escape = html.escape
+else:
+    def _escape(value: str) -> str:
+        return str(_markupsafe_escape(value))
+
+
+# 分类、用户名、显示名等取值有限且跨请求高度重复，缓存转义结果；
+# 标题、正文、评论等自由文本仍直接调用 _escape / html.escape
+@lru_cache(maxsize=4096)
+def _cached_escape(value: str) -> str:
+    return _escape(value)
+
+# 作者下拉菜单片段：模块加载时构造一次，渲染时仅做占位符替换
+_AUTHOR_ACTION_SEND_DM = (
+    '<li>'
+    '<a class="dropdown-item d-flex align-items-center gap-2" href="/messages?view=compose&receiver={username}">'
+    '<i class="fa-regular fa-comments text-primary"></i>'
+    '<span>发送私信</span>'
+    '</a>'
+    '</li>'
+)
+_AUTHOR_ACTION_LOGIN_DM = (
+    '<li>'
+    '<a class="dropdown-item d-flex align-items-center gap-2" href="/login">'
+    '<i class="fa-regular fa-comments text-secondary"></i>'
+    '<span>登录后发送私信</span>'
+    '</a>'
+    '</li>'
+)
+_AUTHOR_ACTION_SELF_DM = (
+    '<li>'
+    '<span class="dropdown-item-text text-muted d-flex align-items-center gap-2">'
+    '<i class="fa-regular fa-comments text-secondary"></i>'
+    '<span>无法给自己发送私信</span>'
+    '</span>'
+    '</li>'
+)
+_AUTHOR_ACTION_PROFILE = (
+    '<li>'
+    '<a class="dropdown-item d-flex align-items-center gap-2" href="/profile?username={username}">'
+    '<i class="fa-regular fa-id-card text-success"></i>'
+    '<span>查看个人主页</span>'
+    '</a>'
+    '</li>'
+)
+_AUTHOR_ACTION_SUBSCRIBE = (
+    '<li>'
+    '<form method="post" action="/subscriptions/author" class="dropdown-item p-0">'
+    '<input type="hidden" name="author" value="{username}">'
+    '<input type="hidden" name="next" value="{redirect}">'
+    '<button type="submit" class="dropdown-item-action d-flex align-items-center gap-2">'
+    '<i class="fa-solid fa-bell text-warning"></i>'
+    '<span>订阅作者</span>'
+    '</button>'
+    '</form>'
+    '</li>'
+)
+_AUTHOR_ACTION_LOGIN_SUBSCRIBE = (
+    '<li>'
+    '<a class="dropdown-item d-flex align-items-center gap-2" href="/login">'
+    '<i class="fa-solid fa-bell text-secondary"></i>'
+    '<span>登录后订阅作者</span>'
+    '</a>'
+    '</li>'
+)
+_AUTHOR_ACTION_OWN_POST = (
+    '<li>'
+    '<span class="dropdown-item-text text-muted d-flex align-items-center gap-2">'
+    '<i class="fa-solid fa-bell-slash text-secondary"></i>'
+    '<span>这是你的文章</span>'
+    '</span>'
+    '</li>'
+)
+_AUTHOR_ACTIONS_UNAVAILABLE = (
+    '<li><span class="dropdown-item-text text-muted d-flex align-items-center gap-2">'
+    '<i class="fa-regular fa-comments text-secondary"></i>'
+    '<span>作者信息暂不可用</span>'
+    '</span></li>'
+    '<li><span class="dropdown-item-text text-muted d-flex align-items-center gap-2">'
+    '<i class="fa-regular fa-id-card text-secondary"></i>'
+    '<span>无法查看主页</span>'
+    '</span></li>'
+    '<li><span class="dropdown-item-text text-muted d-flex align-items-center gap-2">'
+    '<i class="fa-solid fa-circle-info text-secondary"></i>'
+    '<span>暂无法订阅该作者</span>'
+    '</span></li>'
+)
+_SUBSCRIPTION_CARD_TPL = (
+    '<article class="post-card position-relative">'
+    '<h3 class="h6 mb-2"><a class="stretched-link" href="/posts/{post_id}">{title}</a></h3>'
+    '<p class="meta mb-0"><i class="fa-regular fa-user me-1"></i>{author} · '
+    '<i class="fa-solid fa-tag me-1 ms-2"></i>{category} · '
+    '<i class="fa-regular fa-clock me-1 ms-2"></i>{created_at}</p>'
+    "</article>"
+)
+_CONTACT_ITEM_TPL = (
+    '<a class="{classes}" href="#" data-username="{username}" data-display-name="{display_name}" data-role="open-conversation">'
+    '<div class="d-flex align-items-center gap-2">'
+    '<i class="fa-regular fa-user-circle text-primary"></i>'
+    '<span>{display_name}</span>'
+    '</div>'
+    '</a>'
+)
+_BUBBLE_TPL = (
+    '<div class="message-bubble {role}">'
+    '<div class="message-body"><span class="message-sender">{sender}</span>'
+    '<div class="message-text">{text}</div>'
+    '<span class="message-time">{time}</span></div>'
+    '</div>'
+)
+_LOCKED_CONTENT_TPL = (
+    '<div class="card border-warning mb-3" style="max-width: 30rem; margin: 2rem auto;">'
+    '<div class="card-header bg-warning text-dark fw-bold">'
+    '<i class="fa-solid fa-lock me-2"></i>内容已加密'
+    '</div>'
+    '<div class="card-body text-center">'
+    '<p class="card-text">该文章受古老咒语保护，请输入密码解锁。</p>'
+    '<form class="post-unlock-form" data-post-id="{post_id}">'
+    '<div class="input-group mb-3">'
+    '<input type="password" name="password" class="form-control" placeholder="请输入密码..." required>'
+    '<button class="btn btn-dark" type="submit">解封</button>'
+    '</div>'
+    '<div class="unlock-error text-danger small" style="display:none;"></div>'
+    '</form>'
+    '</div>'
+    '</div>'
+)
 
 
 class BaseHandler:
@@ -404,7 +616,7 @@ class BaseHandler:
 
     def _build_header_actions(self, user: Optional[Dict[str, Any]]) -> str:
         if user:
-            display_name = html.escape(user.get("display_name") or user.get("username", "用户"))
+            display_name = _cached_escape(user.get("display_name") or user.get("username", "用户"))
             return (
                 '<span class="navbar-text fw-semibold me-3">'
                 f'<i class="fa-regular fa-circle-user me-2"></i>{display_name}'
@@ -546,8 +758,8 @@ class UserHandlers(BaseHandler):
             "page_description": "创建新账号，畅享订阅、创作与互动功能。",
             "message": message,
             "message_block": alert_html,
+            **self._layout_context(None, user),
         }
-        context.update(self._layout_context(None, user))
         return self.renderer.render("register.html", context)
 
     def _render_login(self, user: Optional[Dict[str, Any]], message: str) -> HTTPResponse:
@@ -563,8 +775,8 @@ class UserHandlers(BaseHandler):
             "page_description": "输入账号与密码，继续你的创作与探索之旅。",
             "message": message,
             "message_block": alert_html,
+            **self._layout_context(None, user),
         }
-        context.update(self._layout_context(None, user))
         return self.renderer.render("login.html", context)
 
 
@@ -621,11 +833,13 @@ class BasicHandlers(BaseHandler):
         if category:
             filters["category"] = category
 
-        posts = self.posts.list_posts(filters=filters)
+        posts = self.posts.list_posts(filters=filters, viewer=user, visible_only=True)
         cookies = request.get_cookies()
         if user:
-            posts = self._filter_accessible_posts(posts, user, cookies)
-            subscription_posts = self._load_subscription_posts(user, cookies)
+            # 首页列表与订阅推送常包含同一批文章，本次请求内按文章 id 复用可见性判断结果
+            access_cache: Dict[str, bool] = {}
+            posts = self._filter_accessible_posts(posts, user, cookies, access_cache)
+            subscription_posts = self._load_subscription_posts(user, cookies, access_cache)
             subscription_html = self._build_post_cards(subscription_posts, compact=True, current_user=user)
         else:
             posts = [post for post in posts if self._is_public_post(post)]
@@ -649,8 +863,8 @@ class BasicHandlers(BaseHandler):
             "subscription_posts_html": subscription_html,
             "search_keyword": keyword,
             "search_category_options": category_options_html,
+            **self._layout_context("home", user),
         }
-        context.update(self._layout_context("home", user))
         return self.renderer.render("index.html", context)
 
     def profile(self, request: HTTPRequest) -> HTTPResponse:
@@ -689,14 +903,13 @@ class BasicHandlers(BaseHandler):
                     "subscription_heading": "作者订阅",
                     "create_button_html": "",
                     "viewing_self": False,
+                    **self._layout_context("profile", current_user),
                 }
-                context.update(self._layout_context("profile", current_user))
                 return self.renderer.render("profile.html", context)
         if target_user is None:
             target_user = current_user
 
         if target_user is None:
-            from http_types import create_redirect
             return create_redirect("/login")
 
         viewing_self = bool(current_user and current_user["id"] == target_user["id"])
@@ -973,8 +1186,7 @@ class BasicHandlers(BaseHandler):
     def _render_profile_bio(self, bio_text: str) -> str:
         if not bio_text:
             return ""
-        escaped = html.escape(bio_text)
-        return escaped.replace("\n", "<br>")
+        return _plain_text_to_html(bio_text)
 
     def _build_profile_edit_section(self, user: Dict[str, Any], sanitized_bio: str) -> str:
         display_value = html.escape(user.get("display_name") or user.get("username") or "")
@@ -1036,24 +1248,33 @@ class BasicHandlers(BaseHandler):
     ) -> str:
         if not posts:
             return '<div class="alert alert-light border-dashed text-muted" role="alert">暂无文章。</div>'
+        post_ids = [post.get("id", "") for post in posts]
+        like_counts = self.interactions.count_likes_for_posts(post_ids)
+        favorite_counts = self.interactions.count_favorites_for_posts(post_ids)
         cards: List[str] = []
+        # 循环内频繁调用的函数先绑定为局部变量
+        escape = _escape
+        cached_escape = _cached_escape
+        format_timestamp = self._format_timestamp
+        append_card = cards.append
         for post in posts:
             post_id = post.get("id", "")
-            title = html.escape(post.get("title", "未命名文章"))
+            escaped_post_id = escape(post_id)
+            title = escape(post.get("title", "未命名文章"))
             summary_text = self._prepare_post_summary(post)
-            summary = html.escape(summary_text)
-            author_display = html.escape(post.get("author", {}).get("display_name", "未知作者"))
-            author_username = html.escape(post.get("author", {}).get("username", ""))
+            summary = escape(summary_text)
+            author_display = cached_escape(post.get("author", {}).get("display_name", "未知作者"))
+            author_username = cached_escape(post.get("author", {}).get("username", ""))
             if author_username:
                 author_html = (
                     f'<a class="text-decoration-none" href="/profile?username={author_username}">{author_display}</a>'
                 )
             else:
                 author_html = author_display
-            category = html.escape(post.get("category", "未分类") or "未分类")
-            created_at = html.escape(self._format_timestamp(post.get("created_at")))
-            likes = self.interactions.count_likes(post_id)
-            favorites = self.interactions.count_favorites(post_id)
+            category = cached_escape(post.get("category", "未分类") or "未分类")
+            created_at = escape(format_timestamp(post.get("created_at")))
+            likes = like_counts.get(post_id, 0)
+            favorites = favorite_counts.get(post_id, 0)
             stats_html = (
                 '<div class="d-flex align-items-center gap-3 text-muted">'
                 f'<span><i class="fa-regular fa-thumbs-up me-1"></i>{likes}</span>'
@@ -1062,7 +1283,7 @@ class BasicHandlers(BaseHandler):
             )
             actions: List[str] = [
                 (
-                    f'<a class="btn btn-outline-primary btn-sm" href="/posts/{html.escape(post_id)}">'
+                    f'<a class="btn btn-outline-primary btn-sm" href="/posts/{escaped_post_id}">'
                     '<i class="fa-regular fa-eye me-1"></i>阅读全文'
                     '</a>'
                 )
@@ -1071,7 +1292,7 @@ class BasicHandlers(BaseHandler):
                 actions.append(
                     '<form method="post" action="/posts/{post_id}/delete" '
                     'onsubmit="return confirm(\'确认删除这篇文章吗？删除后无法恢复。\');">'.format(
-                        post_id=html.escape(post_id)
+                        post_id=escaped_post_id
                     )
                     + '<button type="submit" class="btn btn-outline-danger btn-sm">'
                     '<i class="fa-solid fa-trash-can me-1"></i>删除'
@@ -1079,7 +1300,7 @@ class BasicHandlers(BaseHandler):
                     '</form>'
                 )
             action_html = '<div class="d-flex flex-wrap gap-2">' + "".join(actions) + "</div>"
-            heading = f'<h3 class="h5 mb-1"><a class="stretched-link" href="/posts/{html.escape(post_id)}">{title}</a></h3>'
+            heading = f'<h3 class="h5 mb-1"><a class="stretched-link" href="/posts/{escaped_post_id}">{title}</a></h3>'
             if compact:
                 content_block = (
                     '<article class="post-card p-4">'
@@ -1105,7 +1326,7 @@ class BasicHandlers(BaseHandler):
                     '</div>'
                     '</article>'
                 )
-            cards.append(content_block)
+            append_card(content_block)
         return "".join(cards)
 
     def _prepare_post_summary(self, post: Dict[str, Any]) -> str:
@@ -1122,7 +1343,7 @@ class BasicHandlers(BaseHandler):
     def _build_category_options(self, categories: List[str], selected: str) -> str:
         options = ['<option value="">全部分类</option>']
         for category in categories:
-            escaped = html.escape(category)
+            escaped = _cached_escape(category)
             if category == selected:
                 options.append(f'<option value="{escaped}" selected>{escaped}</option>')
             else:
@@ -1132,17 +1353,23 @@ class BasicHandlers(BaseHandler):
     def _build_subscription_list(self, subscriptions: List[Dict[str, Any]], user_model: Optional["UserModel"] = None) -> str:
         if not subscriptions:
             return '<div class="alert alert-light border-dashed text-muted" role="alert">暂无订阅。</div>'
+        authors: Dict[str, Dict[str, Any]] = {}
+        if user_model:
+            authors = user_model.get_users_by_usernames(
+                [subscription["value"] for subscription in subscriptions if subscription["type"] == "author"]
+            )
         items: List[str] = []
         for subscription in subscriptions:
             label = "分类" if subscription["type"] == "category" else "作者"
             sub_type = html.escape(subscription["type"])
-            value_display = html.escape(subscription["value"])
-            value_attr = html.escape(subscription["value"], quote=True)
+            value_display = _cached_escape(subscription["value"])
+            value_attr = value_display
             if subscription["type"] == "author" and user_model:
-                author_user = user_model.get_user_by_username(subscription["value"])
+                author_user = authors.get(subscription["value"])
                 if author_user:
-                    author_display = html.escape(author_user.get("display_name", value_display))
-                    value_display = author_display
+                    author_display = author_user.get("display_name")
+                    if author_display:
+                        value_display = _cached_escape(author_display)
                     items.append(
                         '<div class="card mb-2 shadow-sm border-0 subscription-item-card">'
                         '<div class="card-body d-flex align-items-center justify-content-between py-2">'
@@ -1178,26 +1405,54 @@ class BasicHandlers(BaseHandler):
                 posts.append(post)
         return posts
 
-    def _load_subscription_posts(self, user: Dict[str, Any], cookies: Dict[str, str]) -> List[Dict[str, Any]]:
+    def _load_subscription_posts(
+        self,
+        user: Dict[str, Any],
+        cookies: Dict[str, str],
+        access_cache: Optional[Dict[str, bool]] = None,
+    ) -> List[Dict[str, Any]]:
         subscriptions = self.subscriptions.list_subscriptions(user["id"])
-        collected: Dict[str, Dict[str, Any]] = {}
-        for subscription in subscriptions:
-            if subscription["type"] == "category":
-                posts = self.posts.list_posts(filters={"category": subscription["value"]})
-            else:
-                posts = self.posts.list_posts(filters={"author": subscription["value"]})
-            for post in posts:
-                if self._post_accessible(post, user, cookies):
-                    collected[post["id"]] = post
-        return list(collected.values())
+        # 同一文章可能同时命中多个订阅，按 id 去重后只做一次可见性判断
+        seen: Set[str] = set()
+        collected: List[Dict[str, Any]] = []
+        for post in _list_subscribed_posts(self.posts, subscriptions, user):
+            post_id = post["id"]
+            if post_id in seen:
+                continue
+            seen.add(post_id)
+            if self._post_accessible_cached(post, user, cookies, access_cache):
+                collected.append(post)
+        return collected
 
-    def _filter_accessible_posts(self, posts: List[Dict[str, Any]], user: Dict[str, Any], cookies: Dict[str, str]) -> List[Dict[str, Any]]:
+    def _filter_accessible_posts(
+        self,
+        posts: List[Dict[str, Any]],
+        user: Dict[str, Any],
+        cookies: Dict[str, str],
+        access_cache: Optional[Dict[str, bool]] = None,
+    ) -> List[Dict[str, Any]]:
         accessible: List[Dict[str, Any]] = []
         for post in posts:
-            if self._post_accessible(post, user, cookies):
+            if self._post_accessible_cached(post, user, cookies, access_cache):
                 accessible.append(post)
         return accessible
 
+    def _post_accessible_cached(
+        self,
+        post: Dict[str, Any],
+        user: Optional[Dict[str, Any]],
+        cookies: Dict[str, str],
+        access_cache: Optional[Dict[str, bool]],
+    ) -> bool:
+        if access_cache is None:
+            return self._post_accessible(post, user, cookies)
+        post_id = post["id"]
+        accessible = access_cache.get(post_id)
+        if accessible is None:
+            accessible = self._post_accessible(post, user, cookies)
+            access_cache[post_id] = accessible
+        return accessible
+
     def _post_accessible(self, post: Dict[str, Any], user: Optional[Dict[str, Any]], cookies: Dict[str, str]) -> bool:
         security = post.get("security", {})
         permission_type = security.get("permission_type", "public")
@@ -1259,9 +1514,9 @@ class ArticleHandlers(BaseHandler):
                 '<script src="/static/js/rich_editor.js"></script>\n'
                 '<script src="/static/js/contrast_editor.js"></script>'
             ),
+            **self._permission_context("public", "", True, False),
+            **self._layout_context("new_post", user),
         }
-        context.update(self._permission_context("public", "", True, False))
-        context.update(self._layout_context("new_post", user))
         return self.renderer.render("new_post.html", context)
 
     def create_post(self, request: HTTPRequest) -> HTTPResponse:
@@ -1395,32 +1650,17 @@ class ArticleHandlers(BaseHandler):
         # === [新增] 根据锁定状态生成内容 HTML ===
         if is_locked_content:
             # 渲染解锁表单
-            post_content_html = f"""
-            <div class="card border-warning mb-3" style="max-width: 30rem; margin: 2rem auto;">
-                <div class="card-header bg-warning text-dark fw-bold">
-                    <i class="fa-solid fa-lock me-2"></i>内容已加密
-                </div>
-                <div class="card-body text-center">
-                    <p class="card-text">该文章受古老咒语保护，请输入密码解锁。</p>
-                    <form class="post-unlock-form" data-post-id="{post['id']}">
-                        <div class="input-group mb-3">
-                            <input type="password" name="password" class="form-control" placeholder="请输入密码..." required>
-                            <button class="btn btn-dark" type="submit">解封</button>
-                        </div>
-                        <div class="unlock-error text-danger small" style="display:none;"></div>
-                    </form>
-                </div>
-            </div>
-            """
+            post_content_html = _LOCKED_CONTENT_TPL.format(post_id=html.escape(post["id"]))
         else:
             # 正常渲染内容
             post_content_html = self._format_content(post.get("content", ""), allow_html=True)
 
+        escaped_title = html.escape(post["title"])
         context = {
-            "page_title": post["title"],
+            "page_title": escaped_title,
             "page_description": self._excerpt(post.get("content", "")),
-            "post_title": html.escape(post["title"]),
-            "post_category": html.escape(post.get("category", "未分类") or "未分类"),
+            "post_title": escaped_title,
+            "post_category": _cached_escape(post.get("category", "未分类") or "未分类"),
             "post_created_at": html.escape(self._format_timestamp(post.get("created_at"))),
             "post_content_html": post_content_html,  # 使用根据权限生成的 HTML
             "like_count": str(like_count),
@@ -1438,17 +1678,12 @@ class ArticleHandlers(BaseHandler):
                 '<script src="https://cdn.jsdelivr.net/npm/html-docx-js@0.3.1/dist/html-docx.js"></script>\n'
                 '<script src="/static/js/post_download.js"></script>'
             ),
+            **author_context,
+            **self._layout_context(None, user),
         }
-        context.update(author_context)
-        context.update(self._layout_context(None, user))
         return self.renderer.render("post.html", context)
-    def add_comment(self, request: HTTPRequest, post_id: str) -> HTTPResponse:
-        user = self.get_current_user(request)
-        if not user:
-            return create_redirect("/login")
-        post = self.posts.get_post_by_id(post_id)
-        if post is None:
-            return self._build_not_found()
+    @require_user_and_post
+    def add_comment(self, request: HTTPRequest, post_id: str, user: Dict[str, Any], post: Dict[str, Any]) -> HTTPResponse:
         form = request.get_form_data()
         content = form.get("content", "").strip()
         parent_id = form.get("parent_id") or None
@@ -1465,7 +1700,6 @@ class ArticleHandlers(BaseHandler):
         return create_redirect(f"/posts/{post_id}")
 
     def unlock_post(self, request: HTTPRequest, post_id: str) -> HTTPResponse:
-        from urllib.parse import quote_plus
         form = request.get_form_data()
         password = form.get("password", "").strip()
         if not password:
@@ -1474,7 +1708,6 @@ class ArticleHandlers(BaseHandler):
             return create_redirect(f"/posts/{post_id}?error={quote_plus('密码错误，请重试')}")
         cookie_key = f"post_access_{post_id}"
         redirect_url = f"/posts/{post_id}"
-        from http_types import HTTPResponse
         response = HTTPResponse(
             302,
             "Found",
@@ -1486,38 +1719,21 @@ class ArticleHandlers(BaseHandler):
         )
         return response
 
-    def handle_favorite(self, request: HTTPRequest, post_id: str) -> HTTPResponse:
-        user = self.get_current_user(request)
-        if not user:
-            return create_redirect("/login")
-        post = self.posts.get_post_by_id(post_id)
-        if post is None:
-            return self._build_not_found()
+    @require_user_and_post
+    def handle_favorite(self, request: HTTPRequest, post_id: str, user: Dict[str, Any], post: Dict[str, Any]) -> HTTPResponse:
         self.interactions.toggle_favorite(user["id"], post_id)
         return create_redirect(f"/posts/{post_id}")
 
-    def handle_like(self, request: HTTPRequest, post_id: str) -> HTTPResponse:
-        user = self.get_current_user(request)
-        if not user:
-            return create_redirect("/login")
-        post = self.posts.get_post_by_id(post_id)
-        if post is None:
-            return self._build_not_found()
+    @require_user_and_post
+    def handle_like(self, request: HTTPRequest, post_id: str, user: Dict[str, Any], post: Dict[str, Any]) -> HTTPResponse:
         self.interactions.toggle_like(user["id"], post_id)
         return create_redirect(f"/posts/{post_id}")
 
-    def delete_post(self, request: HTTPRequest, post_id: str) -> HTTPResponse:
-        user = self.get_current_user(request)
-        if not user:
-            return create_redirect("/login")
-        post = self.posts.get_post_by_id(post_id)
-        if post is None:
-            return self._build_not_found()
+    @require_user_and_post
+    def delete_post(self, request: HTTPRequest, post_id: str, user: Dict[str, Any], post: Dict[str, Any]) -> HTTPResponse:
         if not self.posts.is_author(post, user):
             return self._build_forbidden_response("无权删除这篇文章。")
-        self.comments.delete_comments_by_post(post_id)
-        self.interactions.delete_post_records(post_id)
-        self.posts.delete_post(post_id)
+        self.posts.delete_post_with_records(post_id)
         return create_redirect("/profile")
 
     def _render_new_post(
@@ -1566,9 +1782,9 @@ class ArticleHandlers(BaseHandler):
                 '<script src="/static/js/rich_editor.js"></script>\n'
                 '<script src="/static/js/contrast_editor.js"></script>'
             ),
+            **self._permission_context(permission_type, password_hint, allow_comments, is_encrypted),
+            **self._layout_context("new_post", user),
         }
-        context.update(self._permission_context(permission_type, password_hint, allow_comments, is_encrypted))
-        context.update(self._layout_context("new_post", user))
         return self.renderer.render("new_post.html", context)
 
     def _permission_context(
@@ -1592,7 +1808,7 @@ class ArticleHandlers(BaseHandler):
     def _build_category_select_options(self, categories: List[str], selected: str) -> str:
         options = ['<option value="">未分类</option>']
         for category in categories:
-            escaped = html.escape(category)
+            escaped = _cached_escape(category)
             if category == selected:
                 options.append(f'<option value="{escaped}" selected>{escaped}</option>')
             else:
@@ -1602,35 +1818,32 @@ class ArticleHandlers(BaseHandler):
     def _build_comment_list(self, comments: List[Dict[str, Any]]) -> str:
         if not comments:
             return "<p>暂无评论，快来抢沙发吧！</p>"
-        items: List[str] = []
-        for comment in comments:
-            items.append(self._render_comment_node(comment, depth=0))
-        return "".join(items)
+        return "".join(self._iter_comment_fragments(comments, depth=0))
 
-    def _render_comment_node(self, comment: Dict[str, Any], depth: int) -> str:
-        author = html.escape(comment["author"]["display_name"])
-        created = html.escape(self._format_timestamp(comment.get("created_at")))
-        content_html = self._format_content(comment.get("content", ""))
-        emoji = comment.get("emoji")
-        emoji_html = f'<span class="comment-emoji">{html.escape(emoji)}</span>' if emoji else ""
-        indent_class = f" comment-depth-{depth}"
-        children = comment.get("children", [])
-        children_html = "".join(self._render_comment_node(child, depth + 1) for child in children)
-        return (
-            f'<div class="comment-item{indent_class}">'
-            f'<p class="comment-meta">{author} 发表于 {created}</p>'
-            f'<div class="comment-content">{emoji_html}{content_html}</div>'
-            f'{children_html}'
-            "</div>"
-        )
+    def _iter_comment_fragments(self, comments: List[Dict[str, Any]], depth: int) -> Iterator[str]:
+        # 逐段产出 HTML，由最外层一次 join，避免为每棵子树拼接中间字符串
+        for comment in comments:
+            author = _cached_escape(comment["author"]["display_name"])
+            created = html.escape(self._format_timestamp(comment.get("created_at")))
+            content_html = self._format_content(comment.get("content", ""))
+            emoji = comment.get("emoji")
+            emoji_html = f'<span class="comment-emoji">{html.escape(emoji)}</span>' if emoji else ""
+            yield (
+                f'<div class="comment-item comment-depth-{depth}">'
+                f'<p class="comment-meta">{author} 发表于 {created}</p>'
+                f'<div class="comment-content">{emoji_html}{content_html}</div>'
+            )
+            children = comment.get("children")
+            if children:
+                yield from self._iter_comment_fragments(children, depth + 1)
+            yield "</div>"
 
     def _format_content(self, content: str, allow_html: bool = False) -> str:
         if not content:
             return ""
         if allow_html:
             return self._sanitize_rich_text(content)
-        escaped = html.escape(content)
-        return escaped.replace("\n", "<br>")
+        return _plain_text_to_html(content)
 
     def _sanitize_rich_text(self, content: str) -> str:
         sanitizer = _RichTextSanitizer(_ALLOWED_RICH_TEXT_TAGS, _ALLOWED_RICH_TEXT_ATTRS, _ALLOWED_RICH_TEXT_STYLES)
@@ -1643,48 +1856,21 @@ class ArticleHandlers(BaseHandler):
         post_id = post.get("id", "")
         username = author.get("username") or ""
         display_name = author.get("display_name") or username or "未知作者"
-        escaped_username = html.escape(username)
+        # 约定：escaped_ 前缀的变量均已转义，后续直接拼接，不再重复转义
+        escaped_username = _cached_escape(username)
+        escaped_display_name = _cached_escape(display_name)
         username_label = f"@{escaped_username}" if username else ""
 
         action_items: List[str] = []
         if username:
             if current_user and current_user.get("username") != username:
-                action_items.append(
-                    '<li>'
-                    f'<a class="dropdown-item d-flex align-items-center gap-2" href="/messages?view=compose&receiver={escaped_username}">'
-                    '<i class="fa-regular fa-comments text-primary"></i>'
-                    '<span>发送私信</span>'
-                    '</a>'
-                    '</li>'
-                )
+                action_items.append(_AUTHOR_ACTION_SEND_DM.format(username=escaped_username))
             elif not current_user:
-                action_items.append(
-                    '<li>'
-                    '<a class="dropdown-item d-flex align-items-center gap-2" href="/login">'
-                    '<i class="fa-regular fa-comments text-secondary"></i>'
-                    '<span>登录后发送私信</span>'
-                    '</a>'
-                    '</li>'
-                )
+                action_items.append(_AUTHOR_ACTION_LOGIN_DM)
             else:
-                action_items.append(
-                    '<li>'
-                    '<span class="dropdown-item-text text-muted d-flex align-items-center gap-2">'
-                    '<i class="fa-regular fa-comments text-secondary"></i>'
-                    '<span>无法给自己发送私信</span>'
-                    '</span>'
-                    '</li>'
-                )
+                action_items.append(_AUTHOR_ACTION_SELF_DM)
 
-            profile_href = f"/profile?username={escaped_username}"
-            action_items.append(
-                '<li>'
-                f'<a class="dropdown-item d-flex align-items-center gap-2" href="{profile_href}">'
-                '<i class="fa-regular fa-id-card text-success"></i>'
-                '<span>查看个人主页</span>'
-                '</a>'
-                '</li>'
-            )
+            action_items.append(_AUTHOR_ACTION_PROFILE.format(username=escaped_username))
 
             if current_user and current_user.get("username") != username:
                 redirect_back = f"/posts/{post_id}?subscribed=1" if post_id else "/subscriptions"
@@ -1692,56 +1878,18 @@ class ArticleHandlers(BaseHandler):
                     redirect_back = "/subscriptions"
                 escaped_redirect = html.escape(redirect_back)
                 action_items.append(
-                    '<li>'
-                    '<form method="post" action="/subscriptions/author" class="dropdown-item p-0">'
-                    f'<input type="hidden" name="author" value="{escaped_username}">'
-                    f'<input type="hidden" name="next" value="{escaped_redirect}">'
-                    '<button type="submit" class="dropdown-item-action d-flex align-items-center gap-2">'
-                    '<i class="fa-solid fa-bell text-warning"></i>'
-                    '<span>订阅作者</span>'
-                    '</button>'
-                    '</form>'
-                    '</li>'
+                    _AUTHOR_ACTION_SUBSCRIBE.format(username=escaped_username, redirect=escaped_redirect)
                 )
             elif not current_user:
-                action_items.append(
-                    '<li>'
-                    '<a class="dropdown-item d-flex align-items-center gap-2" href="/login">'
-                    '<i class="fa-solid fa-bell text-secondary"></i>'
-                    '<span>登录后订阅作者</span>'
-                    '</a>'
-                    '</li>'
-                )
+                action_items.append(_AUTHOR_ACTION_LOGIN_SUBSCRIBE)
             else:
-                action_items.append(
-                    '<li>'
-                    '<span class="dropdown-item-text text-muted d-flex align-items-center gap-2">'
-                    '<i class="fa-solid fa-bell-slash text-secondary"></i>'
-                    '<span>这是你的文章</span>'
-                    '</span>'
-                    '</li>'
-                )
+                action_items.append(_AUTHOR_ACTION_OWN_POST)
         else:
-            action_items.extend(
-                [
-                    '<li><span class="dropdown-item-text text-muted d-flex align-items-center gap-2">'
-                    '<i class="fa-regular fa-comments text-secondary"></i>'
-                    '<span>作者信息暂不可用</span>'
-                    '</span></li>',
-                    '<li><span class="dropdown-item-text text-muted d-flex align-items-center gap-2">'
-                    '<i class="fa-regular fa-id-card text-secondary"></i>'
-                    '<span>无法查看主页</span>'
-                    '</span></li>',
-                    '<li><span class="dropdown-item-text text-muted d-flex align-items-center gap-2">'
-                    '<i class="fa-solid fa-circle-info text-secondary"></i>'
-                    '<span>暂无法订阅该作者</span>'
-                    '</span></li>',
-                ]
-            )
+            action_items.append(_AUTHOR_ACTIONS_UNAVAILABLE)
 
         author_profile_link = f"/profile?username={escaped_username}" if username else "#"
         return {
-            "post_author": html.escape(display_name),
+            "post_author": escaped_display_name,
             "author_username_label": username_label,
             "author_action_items_html": "".join(action_items),
             "author_profile_link": author_profile_link,
@@ -1769,14 +1917,7 @@ class ArticleHandlers(BaseHandler):
         )
 
     def _build_not_found(self) -> HTTPResponse:
-        body_text = "未找到内容"
-        body = body_text.encode("utf-8")
-        headers = {
-            "Content-Type": "text/plain; charset=utf-8",
-            "Content-Length": str(len(body)),
-            "Connection": "close",
-        }
-        return HTTPResponse(404, "Not Found", body, headers)
+        return _NOT_FOUND_RESPONSE
 
     def _render_permission_required(self, post: Dict[str, Any], user: Optional[Dict[str, Any]], error_message: str = "") -> HTTPResponse:
         permission = post.get("security", {}).get("permission_type", "public")
@@ -1789,27 +1930,29 @@ class ArticleHandlers(BaseHandler):
         else:
             message = "您暂无权访问该内容。"
         if error_message:
-            message = html.escape(error_message)
+            message = error_message
+        escaped_message = html.escape(message)
+        escaped_title = html.escape(post.get("title", "访问受限"))
         author_context = self._build_author_context(post, user)
         context = {
-            "page_title": post.get("title", "访问受限"),
+            "page_title": escaped_title,
             "page_description": "该内容暂不可见，请根据提示解锁访问权限。",
-            "post_title": html.escape(post.get("title", "访问受限")),
-            "permission_message": message,
-            "post_category": html.escape(post.get("category", "未分类") or "未分类"),
+            "post_title": escaped_title,
+            "permission_message": escaped_message,
+            "post_category": _cached_escape(post.get("category", "未分类") or "未分类"),
             "post_created_at": html.escape(self._format_timestamp(post.get("created_at"))),
-            "post_content_html": f'<p class="permission-message mb-0">{html.escape(message)}</p>',
+            "post_content_html": f'<p class="permission-message mb-0">{escaped_message}</p>',
             "like_count": "0",
             "favorite_count": "0",
-            "comment_list_html": f'<p class="permission-warning mb-0">{html.escape(message)}</p>',
+            "comment_list_html": f'<p class="permission-warning mb-0">{escaped_message}</p>',
             "comment_form_html": self._build_unlock_form(post["id"], permission, post.get("security", {}).get("is_encrypted", False)) if (permission == "password" or post.get("security", {}).get("is_encrypted", False)) else "",
             "like_action_label": "点赞",
             "favorite_action_label": "收藏",
             "post_id": html.escape(post["id"]),
             "post_feedback_html": "",
+            **author_context,
+            **self._layout_context(None, user),
         }
-        context.update(author_context)
-        context.update(self._layout_context(None, user))
         return self.renderer.render("post.html", context)
 
     def _build_unlock_form(self, post_id: str, permission: str, is_encrypted: bool = False) -> str:
@@ -1851,13 +1994,11 @@ class ArticleHandlers(BaseHandler):
         )
 
     def _build_forbidden_response(self, message: str) -> HTTPResponse:
-        body = message.encode("utf-8")
-        headers = {
-            "Content-Type": "text/plain; charset=utf-8",
-            "Content-Length": str(len(body)),
-            "Connection": "close",
-        }
-        return HTTPResponse(403, "Forbidden", body, headers)
+        response = _FORBIDDEN_RESPONSES.get(message)
+        if response is None:
+            response = _plain_text_response(403, "Forbidden", message)
+            _FORBIDDEN_RESPONSES[message] = response
+        return response
 
 
 class SubscriptionHandlers(BaseHandler):
@@ -1892,9 +2033,9 @@ class SubscriptionHandlers(BaseHandler):
             return self._render_page(request, user, "请选择或输入要订阅的分类。")
         existing_categories = self.posts.list_categories()
         if category not in existing_categories:
-            return self._render_page(request, user, f"分类 {html.escape(category)} 不存在，请先选择已有分类或确保该分类下有文章。")
+            return self._render_page(request, user, f"分类 {category} 不存在，请先选择已有分类或确保该分类下有文章。")
         self.subscriptions.add_subscription(user["id"], "category", category)
-        return self._render_page(request, user, f"已订阅分类：{html.escape(category)}。")
+        return self._render_page(request, user, f"已订阅分类：{category}。")
 
     def subscribe_author(self, request: HTTPRequest) -> HTTPResponse:
         user = self.get_current_user(request)
@@ -1910,13 +2051,13 @@ class SubscriptionHandlers(BaseHandler):
             return self._render_page(request, user, "请输入要订阅的作者用户名。")
         author_user = self.users.get_user_by_username(author)
         if not author_user:
-            return self._render_page(request, user, f"用户 {html.escape(author)} 不存在，无法订阅。")
+            return self._render_page(request, user, f"用户 {author} 不存在，无法订阅。")
         if author_user["id"] == user["id"]:
             return self._render_page(request, user, "不能订阅自己。")
         self.subscriptions.add_subscription(user["id"], "author", author)
         if redirect_target:
             return create_redirect(redirect_target)
-        return self._render_page(request, user, f"已订阅作者：{html.escape(author)}。")
+        return self._render_page(request, user, f"已订阅作者：{author}。")
 
     def cancel_subscription(self, request: HTTPRequest) -> HTTPResponse:
         user = self.get_current_user(request)
@@ -1952,31 +2093,35 @@ class SubscriptionHandlers(BaseHandler):
             "subscription_list_html": subscription_list_html,
             "subscription_posts_html": posts_html,
             "message_block": alert_html,
+            **self._layout_context("subscriptions", user),
         }
-        context.update(self._layout_context("subscriptions", user))
         return self.renderer.render("subscriptions.html", context)
 
     def _build_category_options(self, categories: List[str]) -> str:
         options = ['<option value="">请选择分类</option>']
         for category in categories:
-            escaped = html.escape(category)
+            escaped = _cached_escape(category)
             options.append(f'<option value="{escaped}">{escaped}</option>')
         return "".join(options)
 
     def _build_subscription_list(self, subscriptions: List[Dict[str, Any]]) -> str:
         if not subscriptions:
             return '<div class="alert alert-light border-dashed text-muted" role="alert">暂无订阅。</div>'
+        authors = self.users.get_users_by_usernames(
+            [subscription["value"] for subscription in subscriptions if subscription["type"] == "author"]
+        )
         items: List[str] = []
         for subscription in subscriptions:
             label = "分类" if subscription["type"] == "category" else "作者"
             sub_type = html.escape(subscription["type"])
-            value_display = html.escape(subscription["value"])
-            value_attr = html.escape(subscription["value"], quote=True)
+            value_display = _cached_escape(subscription["value"])
+            value_attr = value_display
             action_buttons = []
             if subscription["type"] == "author":
-                author_user = self.users.get_user_by_username(subscription["value"])
-                display_name = author_user.get("display_name", value_display) if author_user else value_display
-                value_display = html.escape(display_name)
+                author_user = authors.get(subscription["value"])
+                display_name = author_user.get("display_name") if author_user else None
+                if display_name:
+                    value_display = _cached_escape(display_name)
                 action_buttons.append(
                     f'<a class="btn btn-sm btn-outline-primary" href="/messages?view=compose&receiver={value_attr}">'
                     '<i class="fa-regular fa-comments me-1"></i>私信</a>'
@@ -2001,16 +2146,17 @@ class SubscriptionHandlers(BaseHandler):
         return '<div class="d-flex flex-column gap-2">' + "".join(items) + "</div>"
 
     def _collect_subscription_posts(self, subscriptions: List[Dict[str, Any]], user: Dict[str, Any], cookies: Dict[str, str]) -> List[Dict[str, Any]]:
-        collected: Dict[str, Dict[str, Any]] = {}
-        for subscription in subscriptions:
-            if subscription["type"] == "category":
-                posts = self.posts.list_posts(filters={"category": subscription["value"]})
-            else:
-                posts = self.posts.list_posts(filters={"author": subscription["value"]})
-            for post in posts:
-                if self._post_accessible(post, user, cookies):
-                    collected[post["id"]] = post
-        return list(collected.values())
+        # 同一文章可能同时命中多个订阅，按 id 去重后只做一次可见性判断
+        seen: Set[str] = set()
+        collected: List[Dict[str, Any]] = []
+        for post in _list_subscribed_posts(self.posts, subscriptions, user):
+            post_id = post["id"]
+            if post_id in seen:
+                continue
+            seen.add(post_id)
+            if self._post_accessible(post, user, cookies):
+                collected.append(post)
+        return collected
 
     def _post_accessible(self, post: Dict[str, Any], user: Optional[Dict[str, Any]], cookies: Dict[str, str]) -> bool:
         security = post.get("security", {})
@@ -2025,19 +2171,24 @@ class SubscriptionHandlers(BaseHandler):
         if not posts:
             return '<div class="alert alert-light border-dashed text-muted" role="alert">当前订阅暂无推送。</div>'
         cards: List[str] = []
+        escape = _escape
+        cached_escape = _cached_escape
+        format_timestamp = self._format_timestamp
+        append_card = cards.append
         for post in posts:
-            post_id = html.escape(post["id"])
-            title = html.escape(post["title"])
-            author = html.escape(post["author"]["display_name"])
-            category = html.escape(post.get("category", "未分类") or "未分类")
-            created_at = html.escape(self._format_timestamp(post.get("created_at")))
-            cards.append(
-                '<article class="post-card position-relative">'
-                f'<h3 class="h6 mb-2"><a class="stretched-link" href="/posts/{post_id}">{title}</a></h3>'
-                f'<p class="meta mb-0"><i class="fa-regular fa-user me-1"></i>{author} · '
-                f'<i class="fa-solid fa-tag me-1 ms-2"></i>{category} · '
-                f'<i class="fa-regular fa-clock me-1 ms-2"></i>{created_at}</p>'
-                "</article>"
+            post_id = escape(post["id"])
+            title = escape(post["title"])
+            author = cached_escape(post["author"]["display_name"])
+            category = cached_escape(post.get("category", "未分类") or "未分类")
+            created_at = escape(format_timestamp(post.get("created_at")))
+            append_card(
+                _SUBSCRIPTION_CARD_TPL.format(
+                    post_id=post_id,
+                    title=title,
+                    author=author,
+                    category=category,
+                    created_at=created_at,
+                )
             )
         return "".join(cards)
 
@@ -2068,8 +2219,8 @@ class MessageHandlers(BaseHandler):
             "receiver_username": receiver or "",
             "current_user_id": user["id"],
             "extra_js_scripts": '<script src="/static/js/mailbox.js"></script>',
+            **self._layout_context("messages", user),
         }
-        context.update(self._layout_context("messages", user))
         return self.renderer.render("mailbox.html", context)
 
     def view_conversation(self, request: HTTPRequest, target_username: str) -> HTTPResponse:
@@ -2081,14 +2232,15 @@ class MessageHandlers(BaseHandler):
             return create_redirect("/messages")
         conversation = self.messages.list_messages_between(user["id"], target["id"])
         conversation_html = self._build_conversation(conversation, user["id"])
+        escaped_display_name = _cached_escape(target["display_name"])
         context = {
-            "page_title": f"与 {html.escape(target['display_name'])} 的对话",
-            "page_description": f"与 {html.escape(target['display_name'])} 的最新对话记录与消息状态。",
-            "target_username": html.escape(target_username),
+            "page_title": f"与 {escaped_display_name} 的对话",
+            "page_description": f"与 {escaped_display_name} 的最新对话记录与消息状态。",
+            "target_username": _cached_escape(target_username),
             "conversation_html": conversation_html,
             "message": "",
+            **self._layout_context("messages", user),
         }
-        context.update(self._layout_context("messages", user))
         return self.renderer.render("conversation.html", context)
 
     def send_message(self, request: HTTPRequest) -> HTTPResponse:
@@ -2109,65 +2261,57 @@ class MessageHandlers(BaseHandler):
     def _collect_contacts(self, user_id: int, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         contacts: Dict[int, Dict[str, Any]] = {}
         for message in messages:
-            if message.get("sender_id") == user_id:
+            sender_id = message.get("sender_id")
+            if sender_id == user_id:
+                other = message.get("receiver")
                 other_id = message.get("receiver_id")
-                receiver = message.get("receiver", {})
-                other_username = receiver.get("username") if isinstance(receiver, dict) else ""
-                other_display = receiver.get("display_name") if isinstance(receiver, dict) else ""
             else:
-                other_id = message.get("sender_id")
-                sender = message.get("sender", {})
-                other_username = sender.get("username") if isinstance(sender, dict) else ""
-                other_display = sender.get("display_name") if isinstance(sender, dict) else ""
-            if not other_username or not other_id:
+                other = message.get("sender")
+                other_id = sender_id
+            if not other_id or other_id in contacts or not isinstance(other, dict):
                 continue
-            if not other_display:
-                other_display = other_username
-            if other_id not in contacts:
-                contacts[other_id] = {
-                    "username": other_username,
-                    "display_name": other_display,
-                }
+            other_username = other.get("username")
+            if not other_username:
+                continue
+            contacts[other_id] = {
+                "username": other_username,
+                "display_name": other.get("display_name") or other_username,
+            }
         return list(contacts.values())
 
     def _build_contact_list(self, contacts: List[Dict[str, Any]], active_username: Optional[str] = None) -> str:
         if not contacts:
             return '<div class="alert alert-light border-dashed text-muted" role="alert">暂无私信联系人，点击"新建私信"开始对话。</div>'
         items: List[str] = []
+        cached_escape = _cached_escape
+        append_item = items.append
         for contact in contacts:
-            username = html.escape(contact["username"])
+            username = cached_escape(contact["username"])
             raw_display = contact["display_name"] or contact["username"]
-            display_name = html.escape(raw_display)
+            display_name = cached_escape(raw_display)
             is_active = active_username == contact["username"]
             classes = "list-group-item list-group-item-action d-flex align-items-center justify-content-between conversation-item"
             if is_active:
                 classes += " active"
-            items.append(
-                f'<a class="{classes}" href="#" data-username="{username}" data-display-name="{display_name}" data-role="open-conversation">'
-                f'<div class="d-flex align-items-center gap-2">'
-                f'<i class="fa-regular fa-user-circle text-primary"></i>'
-                f'<span>{display_name}</span>'
-                f'</div>'
-                '</a>'
-            )
+            append_item(_CONTACT_ITEM_TPL.format(classes=classes, username=username, display_name=display_name))
         return '<div class="list-group list-group-flush">' + "".join(items) + "</div>"
 
     def _build_conversation(self, conversation: List[Dict[str, Any]], current_user_id: int) -> str:
         if not conversation:
             return '<div class="message-thread"><div class="alert alert-light border-dashed text-muted mb-0" role="alert">暂未开始对话，发送第一条私信吧！</div></div>'
         bubbles: List[str] = []
+        escape = _escape
+        cached_escape = _cached_escape
+        format_timestamp = self._format_timestamp
+        append_bubble = bubbles.append
         for message in conversation:
             is_self = message["sender_id"] == current_user_id
             role_class = "message-bubble--self" if is_self else "message-bubble--other"
-            sender_label = "我" if is_self else html.escape(message["sender"]["display_name"] or message["sender"]["username"])
-            created_at = html.escape(self._format_timestamp(message.get("created_at")))
-            content_html = html.escape(message.get("content", "")).replace("\n", "<br>")
-            bubbles.append(
-                '<div class="message-bubble {role}">'.format(role=role_class)
-                + f'<div class="message-body"><span class="message-sender">{sender_label}</span>'
-                + f'<div class="message-text">{content_html}</div>'
-                + f'<span class="message-time">{created_at}</span></div>'
-                + "</div>"
+            sender_label = "我" if is_self else cached_escape(message["sender"]["display_name"] or message["sender"]["username"])
+            created_at = escape(format_timestamp(message.get("created_at")))
+            content_html = _plain_text_to_html(message.get("content", ""))
+            append_bubble(
+                _BUBBLE_TPL.format(role=role_class, sender=sender_label, text=content_html, time=created_at)
             )
         return '<div class="message-thread">' + "".join(bubbles) + "</div>"
 
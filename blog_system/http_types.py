@@ -1,5 +1,63 @@
 import json
-from typing import Dict, Optional, Any
+import re
+from typing import Dict, List, Optional, Any
+from urllib.parse import unquote_plus, unquote_to_bytes
+
+try:
+    import httptools
+except ImportError:
+    httptools = None
+
+
+# 每个 "name=value" 片段一次匹配，名称与值两侧空白由正则剔除；不含 "=" 的片段被跳过
+_COOKIE_RE = re.compile(r"\s*([^=;]*?)\s*=\s*([^;]*?)\s*(?:;|$)")
+
+
+def _parse_qs_first(query: str) -> Dict[str, str]:
+    # 单次遍历解析查询串/表单，同名参数保留第一个值（与原 parse_qs 取 values[0] 一致）
+    params: Dict[str, str] = {}
+    for pair in query.split("&"):
+        if not pair:
+            continue
+        key, _, value = pair.partition("=")
+        key = unquote_plus(key)
+        if key not in params:
+            params[key] = unquote_plus(value)
+    return params
+
+
+def _parse_form_bytes_first(body: bytes, charset: str) -> Dict[str, str]:
+    # 直接在原始字节上切分表单，逐个字段解码，不再先把整个请求体解码成一份完整字符串
+    params: Dict[str, str] = {}
+    for pair in body.split(b"&"):
+        if not pair:
+            continue
+        key, _, value = pair.partition(b"=")
+        key_text = unquote_to_bytes(key.replace(b"+", b" ")).decode(charset, errors="replace")
+        if key_text not in params:
+            params[key_text] = unquote_to_bytes(value.replace(b"+", b" ")).decode(charset, errors="replace")
+    return params
+
+
+class _HttptoolsRequestProtocol:
+    # httptools 解析回调：按字节收集请求行、头部和正文，解析完成后一次性写回 HTTPRequest
+    def __init__(self) -> None:
+        self.url_parts: List[bytes] = []
+        self.headers: Dict[str, str] = {}
+        self.body_parts: List[bytes] = []
+        self.headers_complete = False
+
+    def on_url(self, url: bytes) -> None:
+        self.url_parts.append(url)
+
+    def on_header(self, name: bytes, value: bytes) -> None:
+        self.headers[name.lower().decode("latin-1")] = value.strip().decode("utf-8", errors="replace")
+
+    def on_headers_complete(self) -> None:
+        self.headers_complete = True
+
+    def on_body(self, body: bytes) -> None:
+        self.body_parts.append(body)
 
 
 class HTTPRequest:
@@ -16,9 +74,49 @@ class HTTPRequest:
         self._cookies_cache: Optional[Dict[str, str]] = None
         self._files_cache: Optional[Dict[str, Dict[str, Any]]] = None
         self._json_cache: Optional[Any] = None
+        self._content_type = ""
+        self._content_main = ""
+        self._charset = "utf-8"
         self._parse()
 
     def _parse(self) -> None:
+        parsed = False
+        if httptools is not None:
+            try:
+                parsed = self._parse_with_httptools()
+            except (httptools.HttpParserError, httptools.HttpParserUpgrade):
+                parsed = False
+        if not parsed:
+            self._parse_fallback()
+        self._parse_content_type()
+
+    def _parse_content_type(self) -> None:
+        # Content-Type 与 charset 只在解析阶段拆分一次，表单/JSON 读取时直接比较
+        self._content_type = self.headers.get("content-type", "")
+        main, _, parameters = self._content_type.partition(";")
+        self._content_main = main.strip().lower()
+        for parameter in parameters.split(";"):
+            name, _, value = parameter.strip().partition("=")
+            if name.lower() == "charset" and value:
+                self._charset = value.strip().strip('"')
+                break
+
+    def _parse_with_httptools(self) -> bool:
+        protocol = _HttptoolsRequestProtocol()
+        parser = httptools.HttpRequestParser(protocol)
+        parser.feed_data(self.raw_data)
+        if not protocol.headers_complete:
+            return False
+        self.method = parser.get_method().decode("ascii")
+        self.http_version = "HTTP/" + parser.get_http_version()
+        full_path = b"".join(protocol.url_parts).decode("utf-8", errors="replace")
+        path_part, _, self.query = full_path.partition("?")
+        self.path = path_part or "/"
+        self.headers = protocol.headers
+        self.body = b"".join(protocol.body_parts)
+        return True
+
+    def _parse_fallback(self) -> None:
         header_bytes, separator, body_bytes = self.raw_data.partition(b"\r\n\r\n")
         header_text = header_bytes.decode("utf-8", errors="replace")
         header_lines = header_text.split("\r\n")
@@ -59,41 +157,16 @@ class HTTPRequest:
 
     def get_query_params(self) -> Dict[str, str]:
         if self._query_params_cache is None:
-            from urllib.parse import parse_qs
-
-            parsed = parse_qs(self.query, keep_blank_values=True)
-            simplified: Dict[str, str] = {}
-            for key, values in parsed.items():
-                if values:
-                    simplified[key] = values[0]
-                else:
-                    simplified[key] = ""
-            self._query_params_cache = simplified
+            self._query_params_cache = _parse_qs_first(self.query)
         return self._query_params_cache
 
     def get_form_data(self) -> Dict[str, str]:
         if self._form_params_cache is None:
-            content_type = self.get_header("content-type", "")
-            if content_type is None:
-                content_type = ""
-            if "application/x-www-form-urlencoded" in content_type:
-                from urllib.parse import parse_qs
-
-                charset = "utf-8"
-                if "charset=" in content_type:
-                    charset = content_type.split("charset=", 1)[1]
-                decoded = self.body.decode(charset, errors="replace")
-                parsed = parse_qs(decoded, keep_blank_values=True)
-                simplified: Dict[str, str] = {}
-                for key, values in parsed.items():
-                    if values:
-                        simplified[key] = values[0]
-                    else:
-                        simplified[key] = ""
-                self._form_params_cache = simplified
+            if self._content_main == "application/x-www-form-urlencoded":
+                self._form_params_cache = _parse_form_bytes_first(self.body, self._charset)
                 self._files_cache = {}
-            elif "multipart/form-data" in content_type:
-                self._parse_multipart_form(content_type)
+            elif self._content_main == "multipart/form-data":
+                self._parse_multipart_form(self._content_type)
             else:
                 self._form_params_cache = {}
                 self._files_cache = {}
@@ -110,8 +183,7 @@ class HTTPRequest:
     def get_json(self) -> Optional[Any]:
         if self._json_cache is not None:
             return self._json_cache
-        content_type = self.get_header("content-type", "")
-        if not content_type or "application/json" not in content_type.lower():
+        if self._content_main != "application/json":
             return None
         try:
             decoded = self.body.decode("utf-8")
@@ -122,15 +194,8 @@ class HTTPRequest:
 
     def get_cookies(self) -> Dict[str, str]:
         if self._cookies_cache is None:
-            cookie_header = self.get_header("cookie", "")
-            cookies: Dict[str, str] = {}
-            if cookie_header:
-                parts = cookie_header.split(";")
-                for part in parts:
-                    if "=" in part:
-                        name, value = part.split("=", 1)
-                        cookies[name.strip()] = value.strip()
-            self._cookies_cache = cookies
+            cookie_header = self.headers.get("cookie", "")
+            self._cookies_cache = dict(_COOKIE_RE.findall(cookie_header)) if cookie_header else {}
         return self._cookies_cache
 
     def _parse_multipart_form(self, content_type: str) -> None:
@@ -148,21 +213,28 @@ class HTTPRequest:
             self._files_cache = {}
             return
         boundary_bytes = ("--" + boundary_token).encode("utf-8")
-        segments = self.body.split(boundary_bytes)
+        body = self.body
+        body_view = memoryview(body)
+        boundary_length = len(boundary_bytes)
         form_values: Dict[str, str] = {}
         file_values: Dict[str, Dict[str, Any]] = {}
-        for segment in segments:
-            if not segment:
-                continue
-            if segment == b"--\r\n" or segment == b"--" or segment == b"\r\n--" or segment == b"--\r\n--":
-                continue
-            if segment.startswith(b"\r\n"):
-                segment = segment[2:]
-            if segment.endswith(b"\r\n"):
-                segment = segment[:-2]
-            header_bytes, separator, content_bytes = segment.partition(b"\r\n\r\n")
-            if not separator:
+        # 直接在原始字节上按分隔符扫描，只解码每段的头部，文件内容从 memoryview 复制一次
+        position = body.find(boundary_bytes)
+        while position != -1:
+            start = position + boundary_length
+            if body.startswith(b"--", start):
+                break
+            position = body.find(boundary_bytes, start)
+            end = position if position != -1 else len(body)
+            if body.startswith(b"\r\n", start):
+                start += 2
+            if body.endswith(b"\r\n", start, end):
+                end -= 2
+            header_end = body.find(b"\r\n\r\n", start, end)
+            if header_end == -1:
                 continue
+            header_bytes = body[start:header_end]
+            content_start = header_end + 4
             header_text = header_bytes.decode("utf-8", errors="replace")
             headers = header_text.split("\r\n")
             disposition_header = ""
@@ -194,27 +266,57 @@ class HTTPRequest:
                 file_values[name] = {
                     "filename": filename,
                     "content_type": content_type_value,
-                    "content": content_bytes,
+                    "content": bytes(body_view[content_start:end]),
                 }
             else:
-                form_values[name] = content_bytes.decode("utf-8", errors="replace")
+                form_values[name] = body[content_start:end].decode("utf-8", errors="replace")
         self._form_params_cache = form_values
         self._files_cache = file_values
 
 
 class HTTPResponse:
-    def __init__(self, status_code: int, reason: str, body: bytes, headers: Optional[Dict[str, str]] = None) -> None:
+    def __init__(
+        self,
+        status_code: int,
+        reason: str,
+        body: bytes,
+        headers: Optional[Dict[str, str]] = None,
+        file_path: Optional[str] = None,
+    ) -> None:
         self.status_code = status_code
         self.reason = reason
         self.body = body
         self.headers = headers or {}
+        # 正文是磁盘文件时 body 为空，发送时把文件直接交给内核（sendfile），不读入内存
+        self.file_path = file_path
+        self._set_cookies: List[str] = []
+
+    def head_bytes(self, keep_alive: Optional[str] = None) -> bytes:
+        parts = [f"HTTP/1.1 {self.status_code} {self.reason}\r\n"]
+        if keep_alive is None:
+            parts.extend(f"{name}: {value}\r\n" for name, value in self.headers.items())
+        else:
+            # 保持连接：只在输出时替换处理函数写入的 Connection 头，不修改 headers（响应对象可能被缓存共享）
+            parts.extend(
+                f"{name}: {value}\r\n"
+                for name, value in self.headers.items()
+                if name.lower() not in ("connection", "keep-alive")
+            )
+            parts.append(f"Connection: keep-alive\r\nKeep-Alive: {keep_alive}\r\n")
+        parts.extend(f"Set-Cookie: {cookie}\r\n" for cookie in self._set_cookies)
+        parts.append("\r\n")
+        return "".join(parts).encode("utf-8")
+
+    def iter_buffers(self, keep_alive: Optional[str] = None) -> List[bytes]:
+        # 状态行加头部与正文分开，发送时用 sendmsg 分散写出，正文不再复制拼接
+        return [self.head_bytes(keep_alive), self.body]
 
-    def to_bytes(self) -> bytes:
-        response_line = f"HTTP/1.1 {self.status_code} {self.reason}\r\n"
-        header_lines = ""
-        for name, value in self.headers.items():
-            header_lines += f"{name}: {value}\r\n"
-        return (response_line + header_lines + "\r\n").encode("utf-8") + self.body
+    def to_bytes(self, keep_alive: Optional[str] = None) -> bytes:
+        buffers = self.iter_buffers(keep_alive)
+        if self.file_path is not None:
+            with open(self.file_path, "rb") as file_handler:
+                buffers.append(file_handler.read())
+        return b"".join(buffers)
 
     def set_header(self, name: str, value: str) -> None:
         self.headers[name] = value
@@ -223,10 +325,6 @@ class HTTPResponse:
         cookie_value = f"{name}={value}; Path={path}; HttpOnly"
         if max_age is not None:
             cookie_value += f"; Max-Age={max_age}"
-        existing = self.headers.get("Set-Cookie")
-        if existing:
-            cookie_value = f"{existing}\r\nSet-Cookie: {cookie_value}"
-            self.headers["Set-Cookie"] = cookie_value
-        else:
-            self.headers["Set-Cookie"] = cookie_value
+        # 每个 Cookie 单独输出一行 Set-Cookie，不再拼接进 headers 字典
+        self._set_cookies.append(cookie_value)
 
@@ -1,8 +1,53 @@
-import uuid
-from datetime import datetime
+from collections import namedtuple
 from typing import Any, Dict, List, Optional
+from uuid import uuid4
 
 from database import Database
+from timeutil import utc_now_iso
+
+
+# list_comments 在每次文章浏览时都会执行，SQL 集中定义为常量
+_SQL_INSERT_COMMENT = """
+    INSERT INTO comments (
+        id,
+        post_id,
+        author_id,
+        parent_id,
+        content,
+        emoji,
+        created_at,
+        updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_LIST_COMMENTS = """
+    SELECT
+        comments.id,
+        comments.post_id,
+        comments.author_id,
+        comments.parent_id,
+        comments.content,
+        comments.emoji,
+        comments.created_at,
+        comments.updated_at,
+        users.username AS author_username,
+        users.display_name AS author_display_name
+    FROM comments
+    INNER JOIN users ON users.id = comments.author_id
+    WHERE comments.post_id = ?
+    ORDER BY comments.created_at ASC
+"""
+_SQL_DELETE_COMMENT = "DELETE FROM comments WHERE id = ?"
+_SQL_DELETE_COMMENTS_BY_POST = "DELETE FROM comments WHERE post_id = ?"
+
+# 字段顺序与 _SQL_LIST_COMMENTS 的列一致；按位置构造元组，省去 sqlite3.Row 的按名查找
+CommentRow = namedtuple(
+    "CommentRow",
+    "id post_id author_id parent_id content emoji created_at updated_at author_username author_display_name",
+)
+
+
+def _comment_row_factory(cursor: Any, row: tuple) -> CommentRow:
+    return CommentRow._make(row)
 
 
 class CommentModel:
@@ -17,21 +62,10 @@ class CommentModel:
         parent_id: Optional[str] = None,
         emoji: Optional[str] = None,
     ) -> str:
-        comment_id = uuid.uuid4().hex
-        now = datetime.utcnow().isoformat()
+        comment_id = uuid4().hex
+        now = utc_now_iso()
         self.database.execute(
-            """
-            INSERT INTO comments (
-                id,
-                post_id,
-                author_id,
-                parent_id,
-                content,
-                emoji,
-                created_at,
-                updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
+            _SQL_INSERT_COMMENT,
             (
                 comment_id,
                 post_id,
@@ -46,75 +80,43 @@ class CommentModel:
         return comment_id
 
     def list_comments(self, post_id: str) -> List[Dict[str, Any]]:
-        rows = self.database.fetch_all(
-            """
-            SELECT
-                comments.id,
-                comments.post_id,
-                comments.author_id,
-                comments.parent_id,
-                comments.content,
-                comments.emoji,
-                comments.created_at,
-                comments.updated_at,
-                users.username AS author_username,
-                users.display_name AS author_display_name
-            FROM comments
-            INNER JOIN users ON users.id = comments.author_id
-            WHERE comments.post_id = ?
-            ORDER BY comments.created_at ASC
-            """,
-            (post_id,),
-        )
-        result: List[Dict[str, Any]] = []
-        for row in rows:
-            result.append(
-                {
-                    "id": row["id"],
-                    "post_id": row["post_id"],
-                    "author_id": row["author_id"],
-                    "parent_id": row["parent_id"],
-                    "content": row["content"],
-                    "emoji": row["emoji"],
-                    "created_at": row["created_at"],
-                    "updated_at": row["updated_at"],
-                    "author": {
-                        "username": row["author_username"],
-                        "display_name": row["author_display_name"],
-                    },
-                    "children": [],
-                }
-            )
-        return result
+        rows = self.database.fetch_all(_SQL_LIST_COMMENTS, (post_id,), row_factory=_comment_row_factory)
+        return [
+            {
+                "id": row.id,
+                "post_id": row.post_id,
+                "author_id": row.author_id,
+                "parent_id": row.parent_id,
+                "content": row.content,
+                "emoji": row.emoji,
+                "created_at": row.created_at,
+                "updated_at": row.updated_at,
+                "author": {
+                    "username": row.author_username,
+                    "display_name": row.author_display_name,
+                },
+                "children": [],
+            }
+            for row in rows
+        ]
 
     def list_nested_comments(self, post_id: str) -> List[Dict[str, Any]]:
         comments = self.list_comments(post_id)
-        comment_map: Dict[str, Dict[str, Any]] = {}
+        # list_comments 已为每条评论初始化 children，这里只需建索引并挂接一次
+        comment_map = {comment["id"]: comment for comment in comments}
         roots: List[Dict[str, Any]] = []
         for comment in comments:
-            comment["children"] = []
-            comment_map[comment["id"]] = comment
-        for comment in comments:
-            parent_id = comment.get("parent_id")
-            if parent_id and parent_id in comment_map:
-                comment_map[parent_id]["children"].append(comment)
+            parent_id = comment["parent_id"]
+            parent = comment_map.get(parent_id) if parent_id else None
+            if parent is not None:
+                parent["children"].append(comment)
             else:
                 roots.append(comment)
         return roots
 
     def delete_comment(self, comment_id: str) -> None:
-        self.database.execute(
-            """
-            DELETE FROM comments WHERE id = ?
-            """,
-            (comment_id,),
-        )
+        self.database.execute(_SQL_DELETE_COMMENT, (comment_id,))
 
     def delete_comments_by_post(self, post_id: str) -> None:
-        self.database.execute(
-            """
-            DELETE FROM comments WHERE post_id = ?
-            """,
-            (post_id,),
-        )
+        self.database.execute(_SQL_DELETE_COMMENTS_BY_POST, (post_id,))
 
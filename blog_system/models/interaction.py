@@ -1,8 +1,21 @@
-import uuid
-from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
 
 from database import Database
+from timeutil import utc_now_iso_seconds
+
+
+# 点赞/收藏相关的热路径 SQL 固定为模块常量，保证每次传给 sqlite3 的是同一字符串，命中连接的语句缓存
+_SQL_DELETE_LIKE = "DELETE FROM likes WHERE user_id = ? AND post_id = ?"
+_SQL_INSERT_LIKE = "INSERT OR IGNORE INTO likes (id, post_id, user_id, created_at) VALUES (?, ?, ?, ?)"
+_SQL_DELETE_FAVORITE = "DELETE FROM favorites WHERE user_id = ? AND post_id = ?"
+_SQL_INSERT_FAVORITE = "INSERT OR IGNORE INTO favorites (id, post_id, user_id, created_at) VALUES (?, ?, ?, ?)"
+_SQL_COUNT_LIKES = "SELECT COUNT(1) AS total FROM likes WHERE post_id = ?"
+_SQL_COUNT_FAVORITES = "SELECT COUNT(1) AS total FROM favorites WHERE post_id = ?"
+_SQL_LIST_FAVORITE_POST_IDS = "SELECT post_id FROM favorites WHERE user_id = ?"
+_SQL_LIST_LIKE_POST_IDS = "SELECT post_id FROM likes WHERE user_id = ?"
+_SQL_DELETE_POST_LIKES = "DELETE FROM likes WHERE post_id = ?"
+_SQL_DELETE_POST_FAVORITES = "DELETE FROM favorites WHERE post_id = ?"
 
 
 class InteractionModel:
@@ -10,48 +23,21 @@ class InteractionModel:
         self.database = database
 
     def toggle_like(self, user_id: int, post_id: str) -> bool:
-        existing = self.database.fetch_one(
-            """
-            SELECT id FROM likes WHERE user_id = ? AND post_id = ?
-            """,
-            (user_id, post_id),
-        )
-        if existing:
-            self.database.execute("DELETE FROM likes WHERE id = ?", (existing["id"],))
-            return False
-        now = datetime.utcnow().isoformat()
-        self.database.execute(
-            """
-            INSERT INTO likes (id, post_id, user_id, created_at)
-            VALUES (?, ?, ?, ?)
-            """,
-            (
-                uuid.uuid4().hex,
-                post_id,
-                user_id,
-                now,
-            ),
-        )
-        return True
+        return self._toggle(_SQL_DELETE_LIKE, _SQL_INSERT_LIKE, user_id, post_id)
 
     def toggle_favorite(self, user_id: int, post_id: str) -> bool:
-        existing = self.database.fetch_one(
-            """
-            SELECT id FROM favorites WHERE user_id = ? AND post_id = ?
-            """,
-            (user_id, post_id),
-        )
-        if existing:
-            self.database.execute("DELETE FROM favorites WHERE id = ?", (existing["id"],))
+        return self._toggle(_SQL_DELETE_FAVORITE, _SQL_INSERT_FAVORITE, user_id, post_id)
+
+    def _toggle(self, delete_sql: str, insert_sql: str, user_id: int, post_id: str) -> bool:
+        deleted = self.database.execute(delete_sql, (user_id, post_id))
+        if deleted > 0:
             return False
-        now = datetime.utcnow().isoformat()
+        now = utc_now_iso_seconds()
+        # 点赞/收藏 id 不对外暴露，直接存 16 字节原始值，主键索引比 32 位十六进制文本小一半
         self.database.execute(
-            """
-            INSERT INTO favorites (id, post_id, user_id, created_at)
-            VALUES (?, ?, ?, ?)
-            """,
+            insert_sql,
             (
-                uuid.uuid4().hex,
+                uuid4().bytes,
                 post_id,
                 user_id,
                 now,
@@ -60,56 +46,48 @@ class InteractionModel:
         return True
 
     def count_likes(self, post_id: str) -> int:
-        row = self.database.fetch_one(
-            """
-            SELECT COUNT(1) AS total FROM likes WHERE post_id = ?
-            """,
-            (post_id,),
-        )
+        row = self.database.fetch_one(_SQL_COUNT_LIKES, (post_id,))
         if row is None:
             return 0
         return int(row["total"])
 
     def count_favorites(self, post_id: str) -> int:
-        row = self.database.fetch_one(
-            """
-            SELECT COUNT(1) AS total FROM favorites WHERE post_id = ?
-            """,
-            (post_id,),
-        )
+        row = self.database.fetch_one(_SQL_COUNT_FAVORITES, (post_id,))
         if row is None:
             return 0
         return int(row["total"])
 
-    def list_favorite_post_ids(self, user_id: int) -> List[str]:
+    def count_likes_for_posts(self, post_ids: List[str]) -> Dict[str, int]:
+        return self._count_for_posts("likes", post_ids)
+
+    def count_favorites_for_posts(self, post_ids: List[str]) -> Dict[str, int]:
+        return self._count_for_posts("favorites", post_ids)
+
+    def _count_for_posts(self, table: str, post_ids: List[str]) -> Dict[str, int]:
+        counts = {post_id: 0 for post_id in post_ids}
+        if not counts:
+            return counts
+        placeholders = ",".join("?" * len(counts))
         rows = self.database.fetch_all(
-            """
-            SELECT post_id FROM favorites WHERE user_id = ?
+            f"""
+            SELECT post_id, COUNT(1) AS total FROM {table}
+            WHERE post_id IN ({placeholders})
+            GROUP BY post_id
             """,
-            (user_id,),
+            tuple(counts),
         )
+        for row in rows:
+            counts[row["post_id"]] = int(row["total"])
+        return counts
+
+    def list_favorite_post_ids(self, user_id: int) -> List[str]:
+        rows = self.database.fetch_all(_SQL_LIST_FAVORITE_POST_IDS, (user_id,))
         return [row["post_id"] for row in rows]
 
     def list_like_post_ids(self, user_id: int) -> List[str]:
-        rows = self.database.fetch_all(
-            """
-            SELECT post_id FROM likes WHERE user_id = ?
-            """,
-            (user_id,),
-        )
+        rows = self.database.fetch_all(_SQL_LIST_LIKE_POST_IDS, (user_id,))
         return [row["post_id"] for row in rows]
 
     def delete_post_records(self, post_id: str) -> None:
-        self.database.execute(
-            """
-            DELETE FROM likes WHERE post_id = ?
-            """,
-            (post_id,),
-        )
-        self.database.execute(
-            """
-            DELETE FROM favorites WHERE post_id = ?
-            """,
-            (post_id,),
-        )
-
+        self.database.execute(_SQL_DELETE_POST_LIKES, (post_id,))
+        self.database.execute(_SQL_DELETE_POST_FAVORITES, (post_id,))
@@ -1,8 +1,158 @@
-import uuid
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+import secrets
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
 
-from database import Database
+from database import Database, split_keyset_cursor
+from timeutil import utc_now_iso
+
+
+# 一次 C 层调用取出 _map_message 需要的全部列，代替逐列按名索引
+_MESSAGE_FIELDS = itemgetter(
+    "id",
+    "sender_id",
+    "receiver_id",
+    "content",
+    "status",
+    "created_at",
+    "sender_username",
+    "sender_display_name",
+    "receiver_username",
+    "receiver_display_name",
+)
+
+
+# 会话列表与双人对话的行查询；*_JSON 版本在 SQLite 中直接拼出 API 所需的 JSON 数组（时间已格式化），
+# 供接口原样输出，省去逐行构造字典再 json.dumps
+_SQL_CONVERSATION_ROWS = """
+    WITH ranked AS (
+        SELECT
+            messages.*,
+            ROW_NUMBER() OVER (
+                PARTITION BY CASE WHEN messages.sender_id = ?1 THEN messages.receiver_id ELSE messages.sender_id END
+                ORDER BY messages.created_at DESC, messages.id DESC
+            ) AS position
+        FROM messages
+        WHERE (messages.sender_id = ?1 OR messages.receiver_id = ?1) AND messages.status IN ('normal', 'read')
+    )
+    SELECT
+        ranked.id,
+        ranked.sender_id,
+        ranked.receiver_id,
+        ranked.content,
+        ranked.status,
+        ranked.created_at,
+        sender.username AS sender_username,
+        sender.display_name AS sender_display_name,
+        receiver.username AS receiver_username,
+        receiver.display_name AS receiver_display_name
+    FROM ranked
+    INNER JOIN users AS sender ON sender.id = ranked.sender_id
+    INNER JOIN users AS receiver ON receiver.id = ranked.receiver_id
+    WHERE ranked.position = 1{before}
+    ORDER BY ranked.created_at DESC, ranked.id DESC
+    LIMIT ?
+"""
+_SQL_MESSAGES_BETWEEN_ROWS = """
+    SELECT * FROM (
+    SELECT
+        messages.id,
+        messages.sender_id,
+        messages.receiver_id,
+        messages.content,
+        messages.status,
+        messages.created_at,
+        sender.username AS sender_username,
+        sender.display_name AS sender_display_name,
+        receiver.username AS receiver_username,
+        receiver.display_name AS receiver_display_name
+    FROM messages
+    INNER JOIN users AS sender ON sender.id = messages.sender_id
+    INNER JOIN users AS receiver ON receiver.id = messages.receiver_id
+    WHERE ((messages.sender_id = ? AND messages.receiver_id = ?)
+       OR (messages.sender_id = ? AND messages.receiver_id = ?))
+       AND messages.status IN ('normal', 'read'){before}
+    ORDER BY messages.created_at DESC, messages.id DESC
+    LIMIT ?
+    ) ORDER BY created_at ASC, id ASC
+"""
+_SQL_MESSAGE_JSON_ARRAY = """
+    WITH rows AS ({rows})
+    SELECT json_group_array(
+        json_object(
+            'id', rows.id,
+            'sender_id', rows.sender_id,
+            'receiver_id', rows.receiver_id,
+            'content', rows.content,
+            'status', rows.status,
+            'created_at', COALESCE(strftime('%Y-%m-%d %H:%M:%S', trim(rows.created_at)), replace(trim(rows.created_at), 'T', ' '), ''),
+            'sender', json_object('username', rows.sender_username, 'display_name', rows.sender_display_name),
+            'receiver', json_object('username', rows.receiver_username, 'display_name', rows.receiver_display_name)
+        )
+    ) AS payload,
+    COUNT(1) AS total,
+    (SELECT oldest.created_at || '|' || oldest.id FROM rows AS oldest ORDER BY oldest.created_at, oldest.id LIMIT 1) AS oldest
+    FROM rows
+"""
+_SQL_INBOX = """
+    SELECT
+        messages.id,
+        messages.sender_id,
+        messages.receiver_id,
+        messages.content,
+        messages.status,
+        messages.created_at,
+        sender.username AS sender_username,
+        sender.display_name AS sender_display_name
+    FROM messages
+    INNER JOIN users AS sender ON sender.id = messages.sender_id
+    WHERE messages.receiver_id = ? AND messages.status IN ('normal', 'read'){before}
+    ORDER BY messages.created_at DESC, messages.id DESC
+    LIMIT ?
+"""
+_SQL_SENT = """
+    SELECT
+        messages.id,
+        messages.sender_id,
+        messages.receiver_id,
+        messages.content,
+        messages.status,
+        messages.created_at,
+        receiver.username AS receiver_username,
+        receiver.display_name AS receiver_display_name
+    FROM messages
+    INNER JOIN users AS receiver ON receiver.id = messages.receiver_id
+    WHERE messages.sender_id = ? AND messages.status IN ('normal', 'read'){before}
+    ORDER BY messages.created_at DESC, messages.id DESC
+    LIMIT ?
+"""
+
+
+# 按 (created_at, id) 做键集分页：带 before 游标时只取排在游标之后的消息，created_at <= ? 沿 (用户, status, created_at)
+# 索引做有界范围扫描，行值比较再排除同一时间戳中已返回的行。
+# 每条语句预先生成“首页 / 翻页”两个版本，传给 sqlite3 的始终是固定字符串；limit 为 None 时以 LIMIT -1 表示不限
+def _paged(template: str, table: str) -> Tuple[str, str]:
+    condition = f" AND {table}.created_at <= ? AND ({table}.created_at, {table}.id) < (?, ?)"
+    return template.format(before=""), template.format(before=condition)
+
+
+_SQL_INBOX_PAGES = _paged(_SQL_INBOX, "messages")
+_SQL_SENT_PAGES = _paged(_SQL_SENT, "messages")
+_SQL_CONVERSATION_ROWS_PAGES = _paged(_SQL_CONVERSATION_ROWS, "ranked")
+_SQL_MESSAGES_BETWEEN_ROWS_PAGES = _paged(_SQL_MESSAGES_BETWEEN_ROWS, "messages")
+_SQL_CONVERSATION_JSON_PAGES = tuple(
+    _SQL_MESSAGE_JSON_ARRAY.format(rows=rows) for rows in _SQL_CONVERSATION_ROWS_PAGES
+)
+_SQL_MESSAGES_BETWEEN_JSON_PAGES = tuple(
+    _SQL_MESSAGE_JSON_ARRAY.format(rows=rows) for rows in _SQL_MESSAGES_BETWEEN_ROWS_PAGES
+)
+
+
+def _page_parameters(parameters: List[Any], limit: Optional[int], before: Optional[str]) -> List[Any]:
+    if before:
+        before_created_at, before_id = split_keyset_cursor(before)
+        parameters.extend([before_created_at, before_created_at, before_id])
+    parameters.append(limit if limit is not None else -1)
+    return parameters
 
 
 class MessageModel:
@@ -10,8 +160,8 @@ class MessageModel:
         self.database = database
 
     def send_message(self, sender_id: int, receiver_id: int, content: str) -> str:
-        message_id = uuid.uuid4().hex
-        now = datetime.utcnow().isoformat()
+        message_id = secrets.token_hex(16)
+        now = utc_now_iso()
         self.database.execute(
             """
             INSERT INTO messages (
@@ -34,43 +184,37 @@ class MessageModel:
         )
         return message_id
 
-    def get_inbox_messages(self, user_id: int) -> List[Dict[str, Any]]:
-        rows = self.database.fetch_all(
-            """
-            SELECT
-                messages.id,
-                messages.sender_id,
-                messages.receiver_id,
-                messages.content,
-                messages.status,
-                messages.created_at,
-                sender.username AS sender_username,
-                sender.display_name AS sender_display_name
-            FROM messages
-            INNER JOIN users AS sender ON sender.id = messages.sender_id
-            WHERE messages.receiver_id = ? AND messages.status IN ('normal', 'read')
-            ORDER BY messages.created_at DESC
-            """,
-            (user_id,),
+    def get_inbox_messages(
+        self, user_id: int, limit: Optional[int] = None, before: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        rows = self.database.fetch_all_dicts(
+            _SQL_INBOX_PAGES[1 if before else 0],
+            _page_parameters([user_id], limit, before),
         )
-        result: List[Dict[str, Any]] = []
         for row in rows:
-            result.append({
-                "id": row["id"],
-                "sender_id": row["sender_id"],
-                "receiver_id": row["receiver_id"],
-                "content": row["content"],
-                "status": row["status"],
-                "created_at": row["created_at"],
-                "sender": {
-                    "username": row["sender_username"],
-                    "display_name": row["sender_display_name"],
-                },
-            })
-        return result
+            row["sender"] = {
+                "username": row.pop("sender_username"),
+                "display_name": row.pop("sender_display_name"),
+            }
+        return rows
 
-    def get_sent_messages(self, user_id: int) -> List[Dict[str, Any]]:
-        rows = self.database.fetch_all(
+    def get_sent_messages(
+        self, user_id: int, limit: Optional[int] = None, before: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        rows = self.database.fetch_all_dicts(
+            _SQL_SENT_PAGES[1 if before else 0],
+            _page_parameters([user_id], limit, before),
+        )
+        for row in rows:
+            row["receiver"] = {
+                "username": row.pop("receiver_username"),
+                "display_name": row.pop("receiver_display_name"),
+            }
+        return rows
+
+    def get_trash_messages(self, user_id: int) -> List[Dict[str, Any]]:
+        # 按发件/收件两侧拆成 UNION ALL，每一支只关联对方用户；发给自己的消息只由发件一支返回
+        rows = self.database.fetch_all_dicts(
             """
             SELECT
                 messages.id,
@@ -78,35 +222,14 @@ class MessageModel:
                 messages.receiver_id,
                 messages.content,
                 messages.status,
-                messages.created_at,
-                receiver.username AS receiver_username,
-                receiver.display_name AS receiver_display_name
+                messages.created_at AS created_at,
+                1 AS is_sender,
+                other.username AS other_username,
+                other.display_name AS other_display_name
             FROM messages
-            INNER JOIN users AS receiver ON receiver.id = messages.receiver_id
-            WHERE messages.sender_id = ? AND messages.status IN ('normal', 'read')
-            ORDER BY messages.created_at DESC
-            """,
-            (user_id,),
-        )
-        result: List[Dict[str, Any]] = []
-        for row in rows:
-            result.append({
-                "id": row["id"],
-                "sender_id": row["sender_id"],
-                "receiver_id": row["receiver_id"],
-                "content": row["content"],
-                "status": row["status"],
-                "created_at": row["created_at"],
-                "receiver": {
-                    "username": row["receiver_username"],
-                    "display_name": row["receiver_display_name"],
-                },
-            })
-        return result
-
-    def get_trash_messages(self, user_id: int) -> List[Dict[str, Any]]:
-        rows = self.database.fetch_all(
-            """
+            INNER JOIN users AS other ON other.id = messages.receiver_id
+            WHERE messages.sender_id = ? AND messages.status = 'deleted'
+            UNION ALL
             SELECT
                 messages.id,
                 messages.sender_id,
@@ -114,36 +237,23 @@ class MessageModel:
                 messages.content,
                 messages.status,
                 messages.created_at,
-                sender.username AS sender_username,
-                sender.display_name AS sender_display_name,
-                receiver.username AS receiver_username,
-                receiver.display_name AS receiver_display_name
+                0 AS is_sender,
+                other.username AS other_username,
+                other.display_name AS other_display_name
             FROM messages
-            INNER JOIN users AS sender ON sender.id = messages.sender_id
-            INNER JOIN users AS receiver ON receiver.id = messages.receiver_id
-            WHERE (messages.sender_id = ? OR messages.receiver_id = ?) AND messages.status = 'deleted'
-            ORDER BY messages.created_at DESC
+            INNER JOIN users AS other ON other.id = messages.sender_id
+            WHERE messages.receiver_id = ? AND messages.sender_id <> ? AND messages.status = 'deleted'
+            ORDER BY created_at DESC
             """,
-            (user_id, user_id),
+            (user_id, user_id, user_id),
         )
-        result: List[Dict[str, Any]] = []
         for row in rows:
-            is_sender = row["sender_id"] == user_id
-            other_user = {
-                "username": row["receiver_username"] if is_sender else row["sender_username"],
-                "display_name": row["receiver_display_name"] if is_sender else row["sender_display_name"],
+            row["is_sender"] = bool(row["is_sender"])
+            row["other_user"] = {
+                "username": row.pop("other_username"),
+                "display_name": row.pop("other_display_name"),
             }
-            result.append({
-                "id": row["id"],
-                "sender_id": row["sender_id"],
-                "receiver_id": row["receiver_id"],
-                "content": row["content"],
-                "status": row["status"],
-                "created_at": row["created_at"],
-                "is_sender": is_sender,
-                "other_user": other_user,
-            })
-        return result
+        return rows
 
     def get_message_by_id(self, message_id: str, user_id: int) -> Optional[Dict[str, Any]]:
         row = self.database.fetch_one(
@@ -185,46 +295,38 @@ class MessageModel:
             },
         }
 
+    # 归属校验直接写进 UPDATE/DELETE 的 WHERE 条件，按影响行数判断是否成功，省去先查询再修改的往返
     def delete_message(self, message_id: str, user_id: int) -> bool:
-        message = self.get_message_by_id(message_id, user_id)
-        if not message:
-            return False
-        self.database.execute(
+        updated = self.database.execute(
             """
             UPDATE messages
             SET status = 'deleted'
-            WHERE id = ?
+            WHERE id = ? AND (sender_id = ? OR receiver_id = ?)
             """,
-            (message_id,),
+            (message_id, user_id, user_id),
         )
-        return True
+        return updated > 0
 
     def restore_message(self, message_id: str, user_id: int) -> bool:
-        message = self.get_message_by_id(message_id, user_id)
-        if not message or message["status"] != "deleted":
-            return False
-        self.database.execute(
+        updated = self.database.execute(
             """
             UPDATE messages
             SET status = 'normal'
-            WHERE id = ?
+            WHERE id = ? AND (sender_id = ? OR receiver_id = ?) AND status = 'deleted'
             """,
-            (message_id,),
+            (message_id, user_id, user_id),
         )
-        return True
+        return updated > 0
 
     def permanently_delete_message(self, message_id: str, user_id: int) -> bool:
-        message = self.get_message_by_id(message_id, user_id)
-        if not message:
-            return False
-        self.database.execute(
+        deleted = self.database.execute(
             """
             DELETE FROM messages
-            WHERE id = ?
+            WHERE id = ? AND (sender_id = ? OR receiver_id = ?)
             """,
-            (message_id,),
+            (message_id, user_id, user_id),
         )
-        return True
+        return deleted > 0
 
     def mark_as_read(self, message_id: str) -> None:
         self.database.execute(
@@ -236,76 +338,83 @@ class MessageModel:
             (message_id,),
         )
 
-    def list_conversations(self, user_id: int) -> List[Dict[str, Any]]:
+    def list_conversations(
+        self, user_id: int, limit: Optional[int] = None, before: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        # 每个会话对象只返回最新一条消息：窗口函数在 SQLite 内完成分组，再只对这些行关联用户表
         rows = self.database.fetch_all(
-            """
-            SELECT
-                messages.id,
-                messages.sender_id,
-                messages.receiver_id,
-                messages.content,
-                messages.status,
-                messages.created_at,
-                sender.username AS sender_username,
-                sender.display_name AS sender_display_name,
-                receiver.username AS receiver_username,
-                receiver.display_name AS receiver_display_name
-            FROM messages
-            INNER JOIN users AS sender ON sender.id = messages.sender_id
-            INNER JOIN users AS receiver ON receiver.id = messages.receiver_id
-            WHERE (messages.sender_id = ? OR messages.receiver_id = ?) AND messages.status IN ('normal', 'read')
-            ORDER BY messages.created_at DESC
-            """,
-            (user_id, user_id),
+            _SQL_CONVERSATION_ROWS_PAGES[1 if before else 0],
+            _page_parameters([user_id], limit, before),
         )
         result: List[Dict[str, Any]] = []
         for row in rows:
             result.append(self._map_message(row))
         return result
 
-    def list_messages_between(self, user_id: int, target_user_id: int) -> List[Dict[str, Any]]:
+    def list_conversations_json(
+        self, user_id: int, limit: Optional[int] = None, before: Optional[str] = None
+    ) -> Tuple[str, Optional[str]]:
+        row = self.database.fetch_one(
+            _SQL_CONVERSATION_JSON_PAGES[1 if before else 0],
+            _page_parameters([user_id], limit, before),
+        )
+        return self._json_page(row, limit)
+
+    def list_messages_between(
+        self, user_id: int, target_user_id: int, limit: Optional[int] = None, before: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        # 分页时取最近的 limit 条，仍按时间正序返回
         rows = self.database.fetch_all(
-            """
-            SELECT
-                messages.id,
-                messages.sender_id,
-                messages.receiver_id,
-                messages.content,
-                messages.status,
-                messages.created_at,
-                sender.username AS sender_username,
-                sender.display_name AS sender_display_name,
-                receiver.username AS receiver_username,
-                receiver.display_name AS receiver_display_name
-            FROM messages
-            INNER JOIN users AS sender ON sender.id = messages.sender_id
-            INNER JOIN users AS receiver ON receiver.id = messages.receiver_id
-            WHERE ((messages.sender_id = ? AND messages.receiver_id = ?)
-               OR (messages.sender_id = ? AND messages.receiver_id = ?))
-               AND messages.status IN ('normal', 'read')
-            ORDER BY messages.created_at ASC
-            """,
-            (user_id, target_user_id, target_user_id, user_id),
+            _SQL_MESSAGES_BETWEEN_ROWS_PAGES[1 if before else 0],
+            _page_parameters([user_id, target_user_id, target_user_id, user_id], limit, before),
         )
         result: List[Dict[str, Any]] = []
         for row in rows:
             result.append(self._map_message(row))
         return result
 
+    def list_messages_between_json(
+        self, user_id: int, target_user_id: int, limit: Optional[int] = None, before: Optional[str] = None
+    ) -> Tuple[str, Optional[str]]:
+        row = self.database.fetch_one(
+            _SQL_MESSAGES_BETWEEN_JSON_PAGES[1 if before else 0],
+            _page_parameters([user_id, target_user_id, target_user_id, user_id], limit, before),
+        )
+        return self._json_page(row, limit)
+
+    def _json_page(self, row: Any, limit: Optional[int]) -> Tuple[str, Optional[str]]:
+        # 返回 (JSON 数组, 下一页游标)；本页取满时以本页最早一条的原始 created_at 和 id 拼成游标（格式同 keyset_cursor）
+        if row is None:
+            return "[]", None
+        next_before = row["oldest"] if limit is not None and row["total"] >= limit else None
+        return row["payload"], next_before
+
     def _map_message(self, row: Any) -> Dict[str, Any]:
+        (
+            message_id,
+            sender_id,
+            receiver_id,
+            content,
+            status,
+            created_at,
+            sender_username,
+            sender_display_name,
+            receiver_username,
+            receiver_display_name,
+        ) = _MESSAGE_FIELDS(row)
         return {
-            "id": row["id"],
-            "sender_id": row["sender_id"],
-            "receiver_id": row["receiver_id"],
-            "content": row["content"],
-            "status": row["status"],
-            "created_at": row["created_at"],
+            "id": message_id,
+            "sender_id": sender_id,
+            "receiver_id": receiver_id,
+            "content": content,
+            "status": status,
+            "created_at": created_at,
             "sender": {
-                "username": row["sender_username"],
-                "display_name": row["sender_display_name"],
+                "username": sender_username,
+                "display_name": sender_display_name,
             },
             "receiver": {
-                "username": row["receiver_username"],
-                "display_name": row["receiver_display_name"],
+                "username": receiver_username,
+                "display_name": receiver_display_name,
             },
         }
@@ -1,69 +1,93 @@
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+import atexit
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Tuple, Union
 
 from database import Database
+from timeutil import utc_now_iso_seconds
 
-class PerformanceMetricModel:
-    def __init__(self, database: Database) -> None:
-        self.database = database
 
-    def record_metric(self, latency: float, throughput: float, rtt: float, request_count: int):
-        from datetime import datetime
-        now = datetime.utcnow().isoformat()
-        self.database.execute(
-            "INSERT INTO performance_metrics (timestamp, latency_ms, throughput, rtt, request_count) VALUES (?, ?, ?, ?, ?)",
-            (now, latency, throughput, rtt, request_count)
-        )
+_QUEUE_SIZE = 10000
+_FLUSH_BATCH_SIZE = 500
+_FLUSH_INTERVAL_SECONDS = 0.1
+_FLUSH_WAIT_SECONDS = 5.0
+_METRIC_KEYS = ("timestamp", "latency_ms", "throughput", "rtt", "request_count")
+_SQL_INSERT_METRICS = """
+    INSERT INTO performance_metrics (timestamp, latency_ms, throughput, rtt, request_count)
+    VALUES (?, ?, ?, ?, ?)
+"""
 
-    def list_recent_metrics(self, limit: int = 20):
-        # 获取最近的性能数据供前端绘图
-        rows = self.database.fetch_all(
-            "SELECT * FROM performance_metrics ORDER BY id DESC LIMIT ?", 
-            (limit,)
-        )
-        return [dict(row) for row in rows]
 
 class PerformanceMetricModel:
     def __init__(self, database: Database) -> None:
         self.database = database
+        # 每个请求都会记录一条指标：请求线程只入队，后台线程攒批后用一次事务写入；队列满时直接丢弃，不阻塞请求
+        # flush() 向队列放入一个 Event 作为标记：队列先进先出，后台线程写完标记之前的所有指标后再置位
+        self._queue: "queue.Queue[Union[Tuple[str, float, float, float, int], threading.Event]]" = queue.Queue(
+            maxsize=_QUEUE_SIZE
+        )
+        self._flusher = threading.Thread(target=self._flush_loop, name="metric-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
 
     def record_metric(self, latency_ms: float, throughput: float, rtt: float, request_count: int) -> None:
-        timestamp = datetime.utcnow().isoformat()
-        self.database.execute(
-            """
-            INSERT INTO performance_metrics (timestamp, latency_ms, throughput, rtt, request_count)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (
-                timestamp,
-                latency_ms,
-                throughput,
-                rtt,
-                request_count,
-            ),
-        )
+        try:
+            self._queue.put_nowait((utc_now_iso_seconds(), latency_ms, throughput, rtt, request_count))
+        except queue.Full:
+            pass
+
+    def flush(self) -> None:
+        if not self._flusher.is_alive():
+            return
+        marker = threading.Event()
+        try:
+            self._queue.put(marker, timeout=_FLUSH_WAIT_SECONDS)
+        except queue.Full:
+            return
+        marker.wait(_FLUSH_WAIT_SECONDS)
+
+    def _flush_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            rows = []
+            markers = []
+            deadline = time.monotonic() + _FLUSH_INTERVAL_SECONDS
+            while True:
+                if isinstance(item, threading.Event):
+                    # 有调用方在等待，不再攒批，立即写入
+                    markers.append(item)
+                    break
+                rows.append(item)
+                remaining = deadline - time.monotonic()
+                if len(rows) >= _FLUSH_BATCH_SIZE or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if rows:
+                try:
+                    self.database.execute_many(_SQL_INSERT_METRICS, rows)
+                except Exception:
+                    # 指标写入失败不影响服务，丢弃这一批
+                    pass
+            for marker in markers:
+                marker.set()
 
     def list_recent_metrics(self, limit: int = 20) -> List[Dict[str, Any]]:
+        self.flush()
+        # 按自增主键倒序取最近记录，可直接沿主键反向扫描；timestamp 列没有索引，按它排序需要全表排序
         rows = self.database.fetch_all(
             """
             SELECT timestamp, latency_ms, throughput, rtt, request_count
             FROM performance_metrics
-            ORDER BY timestamp DESC
+            ORDER BY id DESC
             LIMIT ?
             """,
             (limit,),
         )
-        metrics: List[Dict[str, Any]] = []
-        for row in rows:
-            metrics.append(
-                {
-                    "timestamp": row["timestamp"],
-                    "latency_ms": row["latency_ms"],
-                    "throughput": row["throughput"],
-                    "rtt": row["rtt"],
-                    "request_count": row["request_count"],
-                }
-            )
+        metrics = [dict(zip(_METRIC_KEYS, row)) for row in rows]
         metrics.reverse()
         return metrics
 
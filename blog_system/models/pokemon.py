@@ -10,7 +10,11 @@ class PokemonModel:
         return dict(row) if row else {"count": 0}
 
     def interact(self, user_id: int = None):
-        # 增加全局点击数
-        self.database.execute("UPDATE pokemon_interactions SET count = count + 1 WHERE id = 1")
+        # 增加全局点击数，RETURNING 直接带回新值，省去再查一次
+        row = self.database.transactional(
+            lambda cursor: cursor.execute(
+                "UPDATE pokemon_interactions SET count = count + 1 WHERE id = 1 RETURNING count"
+            ).fetchone()
+        )
         # 这里也可以扩展记录具体用户的互动
-        return self.get_global_stats()
\ No newline at end of file
+        return {"count": row["count"]} if row else {"count": 0}
\ No newline at end of file
@@ -1,14 +1,94 @@
 import hashlib
-import uuid
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+import hmac
+import json
+import secrets
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from database import Database
+from database import Database, keyset_cursor, split_keyset_cursor
+from querycache import cached, invalidate
+from timeutil import utc_now_iso
+
+
+# _map_post_summary 读取的列，顺序与解包顺序一致
+_POST_SUMMARY_FIELDS = itemgetter(
+    "id",
+    "title",
+    "summary",
+    "category",
+    "tags",
+    "cover_image",
+    "created_at",
+    "updated_at",
+    "author_id",
+    "author_name",
+    "author_username",
+    "author_is_vip",
+    "permission_type",
+    "password_hint",
+    "password_hash",
+    "allow_comments",
+    "is_encrypted",
+)
+
+
+# 文章密码本就以无盐 SHA-256 存储，同一明文总是得到同一摘要，缓存不改变存储格式的安全性；
+# 缓存键是明文密码，只驻留在本进程内存中，maxsize 限制其数量。热门加密文章反复解锁时直接命中
+@lru_cache(maxsize=4096)
+def _hash_password(raw_password: Optional[str]) -> Optional[str]:
+    if raw_password is None:
+        return None
+    return hashlib.sha256(raw_password.encode("utf-8")).hexdigest()
+
+
+# 标签以 JSON 数组存储（可用 json_each 在 SQL 侧按标签过滤）；读取时优先用 orjson 反序列化
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+
+# 大多数文章没有标签，空数组的序列化/反序列化走快速路径，不进入 JSON 编解码器
+_EMPTY_TAGS_JSON = "[]"
+
+
+def _dump_tags(tags: Optional[List[str]]) -> str:
+    if not tags:
+        return _EMPTY_TAGS_JSON
+    return json.dumps(tags, ensure_ascii=False)
+
+
+def _load_tags(value: Optional[str], _loads: Callable[[str], Any] = _json_loads) -> List[str]:
+    if not value or value == _EMPTY_TAGS_JSON:
+        return []
+    return _loads(value)
+
+
+# 文章详情缓存容量（按最近访问淘汰）
+_POST_CACHE_SIZE = 1024
+# 密码摘要缓存未命中的标记；摘要本身可能为 None（文章未设密码）
+_MISSING = object()
+
+
+# trigram 分词至少需要 3 个字符才能走全文索引，更短的关键词仍使用 LIKE 扫描
+_FTS_MIN_KEYWORD_LENGTH = 3
 
 
 class PostModel:
     def __init__(self, database: Database) -> None:
         self.database = database
+        # post_id -> ((文章 updated_at, 作者 updated_at), 详情 dict)；命中前先用主键查询核对两个时间戳，
+        # 文章或作者资料一旦更新即自动失效。缓存的 dict 由调用方共享，只读使用
+        self._post_cache: "OrderedDict[str, Tuple[Tuple[str, str], Dict[str, Any]]]" = OrderedDict()
+        self._post_title_index: Dict[str, str] = {}
+        self._post_cache_lock = threading.Lock()
+        # post_id -> 存储的密码摘要，只缓存存在的文章；随 _evict_post 一起失效。
+        # _evict_post 递增代数，读库期间发生过失效的查询结果不写入缓存，避免旧摘要在失效之后被存回
+        self._password_hash_cache: Dict[str, Optional[str]] = {}
+        self._password_hash_generation = 0
 
     def create_post(
         self,
@@ -25,10 +105,10 @@ class PostModel:
         allow_comments: bool,
         is_encrypted: bool,
     ) -> str:
-        post_id = uuid.uuid4().hex
-        now = datetime.utcnow().isoformat()
-        tags_serialized = ",".join(tags) if tags else ""
-        password_hash = self._hash_password(password) if password else None
+        post_id = secrets.token_hex(16)
+        now = utc_now_iso()
+        tags_serialized = _dump_tags(tags)
+        password_hash = _hash_password(password) if password else None
         self.database.execute(
             """
             INSERT INTO posts (
@@ -67,6 +147,7 @@ class PostModel:
                 now,
             ),
         )
+        invalidate("posts")
         return post_id
 
     def update_post(
@@ -84,9 +165,9 @@ class PostModel:
         allow_comments: bool,
         is_encrypted: bool,
     ) -> None:
-        now = datetime.utcnow().isoformat()
-        tags_serialized = ",".join(tags) if tags else ""
-        password_hash = self._hash_password(password) if password else None
+        now = utc_now_iso()
+        tags_serialized = _dump_tags(tags)
+        password_hash = _hash_password(password) if password else None
         self.database.execute(
             """
             UPDATE posts
@@ -120,6 +201,8 @@ class PostModel:
                 post_id,
             ),
         )
+        self._evict_post(post_id)
+        invalidate("posts")
 
     def set_permissions(
         self,
@@ -130,8 +213,8 @@ class PostModel:
         allow_comments: bool,
         is_encrypted: bool,
     ) -> None:
-        now = datetime.utcnow().isoformat()
-        password_hash = self._hash_password(password) if password else None
+        now = utc_now_iso()
+        password_hash = _hash_password(password) if password else None
         self.database.execute(
             """
             UPDATE posts
@@ -153,8 +236,56 @@ class PostModel:
                 post_id,
             ),
         )
+        self._evict_post(post_id)
+        invalidate("posts")
 
-    def list_posts(self, limit: int = 50, offset: int = 0, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    @cached(tags=("posts",))
+    def list_posts(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        filters: Optional[Dict[str, Any]] = None,
+        viewer: Optional[Dict[str, Any]] = None,
+        visible_only: bool = False,
+    ) -> List[Dict[str, Any]]:
+        base_query, parameters, use_search_index = self._build_list_query(filters, viewer, visible_only, None)
+        if use_search_index:
+            base_query += " ORDER BY bm25(posts_fts), posts.created_at DESC LIMIT ? OFFSET ?"
+        else:
+            base_query += " ORDER BY posts.created_at DESC LIMIT ? OFFSET ?"
+        parameters.extend([limit, offset])
+        rows = self.database.fetch_all_dicts(base_query, parameters)
+        result: List[Dict[str, Any]] = []
+        for row in rows:
+            result.append(self._map_post_summary(row))
+        return result
+
+    @cached(tags=("posts",))
+    def list_posts_keyset(
+        self,
+        limit: int = 50,
+        before: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        viewer: Optional[Dict[str, Any]] = None,
+        visible_only: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # 按 (created_at, id) 倒序的键集分页，返回 (本页文章, 下一页游标)：沿 idx_posts_created 只扫描 limit 行，
+        # 不需要 OFFSET 跳过前面的行，也不需要 COUNT(*)。有关键词时同样按时间而不是相关度排序
+        base_query, parameters, _ = self._build_list_query(filters, viewer, visible_only, before)
+        base_query += " ORDER BY posts.created_at DESC, posts.id DESC LIMIT ?"
+        parameters.append(limit)
+        rows = self.database.fetch_all_dicts(base_query, parameters)
+        posts = [self._map_post_summary(row) for row in rows]
+        next_before = keyset_cursor(posts[-1]["created_at"], posts[-1]["id"]) if len(posts) >= limit else None
+        return posts, next_before
+
+    def _build_list_query(
+        self,
+        filters: Optional[Dict[str, Any]],
+        viewer: Optional[Dict[str, Any]],
+        visible_only: bool,
+        before: Optional[str],
+    ) -> Tuple[str, List[Any], bool]:
         base_query = """
             SELECT
                 posts.id,
@@ -179,35 +310,84 @@ class PostModel:
             """
         clauses: List[str] = []
         parameters: List[Any] = []
+        use_search_index = False
         if filters:
             keyword = filters.get("keyword")
             category = filters.get("category")
             author = filters.get("author")
             permission = filters.get("permission_type")
-            if keyword:
+            tag = filters.get("tag")
+            if keyword and len(keyword) >= _FTS_MIN_KEYWORD_LENGTH:
+                use_search_index = True
+                clauses.append("posts_fts MATCH ?")
+                parameters.append('"' + keyword.replace('"', '""') + '"')
+            elif keyword:
                 clauses.append("(posts.title LIKE ? OR posts.content LIKE ?)")
                 parameters.append(f"%{keyword}%")
                 parameters.append(f"%{keyword}%")
+            # category / author 既可以是单个值，也可以是列表（订阅推送按类型合并成一次 IN 查询）
             if category:
-                clauses.append("posts.category = ?")
-                parameters.append(category)
+                if isinstance(category, (list, tuple)):
+                    clauses.append(f"posts.category IN ({','.join('?' * len(category))})")
+                    parameters.extend(category)
+                else:
+                    clauses.append("posts.category = ?")
+                    parameters.append(category)
             if author:
-                clauses.append("users.username = ?")
-                parameters.append(author)
+                if isinstance(author, (list, tuple)):
+                    clauses.append(f"users.username IN ({','.join('?' * len(author))})")
+                    parameters.extend(author)
+                else:
+                    clauses.append("users.username = ?")
+                    parameters.append(author)
             if permission:
                 clauses.append("posts.permission_type = ?")
                 parameters.append(permission)
+            if tag:
+                clauses.append("EXISTS (SELECT 1 FROM json_each(posts.tags) WHERE json_each.value = ?)")
+                parameters.append(tag)
+        if visible_only:
+            # can_view_post 中不依赖 Cookie 的部分下推到 SQL：私密文章只对作者可见，VIP 文章只对 VIP 可见；
+            # 密码文章是否已解锁取决于请求 Cookie，仍由调用方判断
+            if viewer:
+                clauses.append(
+                    "(posts.permission_type IN ('public', 'password') OR posts.author_id = ?"
+                    " OR (posts.permission_type = 'vip' AND ?))"
+                )
+                parameters.append(viewer["id"])
+                parameters.append(1 if viewer.get("is_vip") else 0)
+            else:
+                clauses.append("posts.permission_type IN ('public', 'password')")
+        if before:
+            # created_at <= ? 让时间索引做范围扫描，行值比较再排除同一时间戳中已返回的行
+            before_created_at, before_id = split_keyset_cursor(before)
+            clauses.append("posts.created_at <= ? AND (posts.created_at, posts.id) < (?, ?)")
+            parameters.extend([before_created_at, before_created_at, before_id])
+        if use_search_index:
+            base_query += " INNER JOIN posts_fts ON posts_fts.post_id = posts.id"
         if clauses:
             base_query += " WHERE " + " AND ".join(clauses)
-        base_query += " ORDER BY posts.created_at DESC LIMIT ? OFFSET ?"
-        parameters.extend([limit, offset])
-        rows = self.database.fetch_all(base_query, parameters)
-        result: List[Dict[str, Any]] = []
-        for row in rows:
-            result.append(self._map_post_summary(row))
-        return result
+        return base_query, parameters, use_search_index
 
     def get_post_by_id(self, post_id: str) -> Optional[Dict[str, Any]]:
+        version_row = self.database.fetch_one(
+            """
+            SELECT posts.updated_at, users.updated_at
+            FROM posts
+            INNER JOIN users ON users.id = posts.author_id
+            WHERE posts.id = ?
+            """,
+            (post_id,),
+        )
+        if version_row is None:
+            self._evict_post(post_id)
+            return None
+        version = (version_row[0], version_row[1])
+        with self._post_cache_lock:
+            entry = self._post_cache.get(post_id)
+            if entry is not None and entry[0] == version:
+                self._post_cache.move_to_end(post_id)
+                return entry[1]
         row = self.database.fetch_one(
             """
             SELECT
@@ -228,7 +408,8 @@ class PostModel:
                 posts.updated_at,
                 users.display_name AS author_name,
                 users.username AS author_username,
-                users.is_vip AS author_is_vip
+                users.is_vip AS author_is_vip,
+                users.updated_at AS author_updated_at
             FROM posts
             INNER JOIN users ON users.id = posts.author_id
             WHERE posts.id = ?
@@ -237,7 +418,9 @@ class PostModel:
         )
         if row is None:
             return None
-        return self._map_post_detail(row)
+        post = self._map_post_detail(row)
+        self._store_post(post, (row["updated_at"], row["author_updated_at"]))
+        return post
 
     def list_categories(self) -> List[str]:
         rows = self.database.fetch_all(
@@ -254,7 +437,7 @@ class PostModel:
         return categories
 
     def list_author_posts(self, author_id: int, limit: int = 50) -> List[Dict[str, Any]]:
-        rows = self.database.fetch_all(
+        rows = self.database.fetch_all_dicts(
             """
             SELECT
                 id,
@@ -275,24 +458,11 @@ class PostModel:
             """,
             (author_id, limit),
         )
-        result: List[Dict[str, Any]] = []
         for row in rows:
-            result.append(
-                {
-                    "id": row["id"],
-                    "title": row["title"],
-                    "summary": row["summary"],
-                    "category": row["category"],
-                    "tags": row["tags"].split(",") if row["tags"] else [],
-                    "cover_image": row["cover_image"],
-                    "permission_type": row["permission_type"],
-                    "allow_comments": bool(row["allow_comments"]),
-                    "is_encrypted": bool(row["is_encrypted"]),
-                    "created_at": row["created_at"],
-                    "updated_at": row["updated_at"],
-                }
-            )
-        return result
+            row["tags"] = _load_tags(row["tags"])
+            row["allow_comments"] = bool(row["allow_comments"])
+            row["is_encrypted"] = bool(row["is_encrypted"])
+        return rows
 
     def delete_post(self, post_id: str) -> None:
         self.database.execute(
@@ -301,8 +471,64 @@ class PostModel:
             """,
             (post_id,),
         )
+        self._evict_post(post_id)
+        invalidate("posts")
+
+    def delete_post_with_records(self, post_id: str) -> None:
+        self.delete_posts_with_records([post_id])
+
+    def delete_posts_with_records(self, post_ids: List[str]) -> None:
+        # 文章连同评论、点赞、收藏在一个事务内删除，要么全部生效要么全部回滚；多篇文章每张表只执行一条 IN 删除
+        post_ids = list(dict.fromkeys(post_ids))
+        if not post_ids:
+            return
+        placeholders = ",".join("?" * len(post_ids))
+        parameters = tuple(post_ids)
+        with self.database.transaction() as cursor:
+            cursor.execute(f"DELETE FROM comments WHERE post_id IN ({placeholders})", parameters)
+            cursor.execute(f"DELETE FROM likes WHERE post_id IN ({placeholders})", parameters)
+            cursor.execute(f"DELETE FROM favorites WHERE post_id IN ({placeholders})", parameters)
+            cursor.execute(f"DELETE FROM posts WHERE id IN ({placeholders})", parameters)
+        for post_id in post_ids:
+            self._evict_post(post_id)
+        invalidate("posts")
+
+    def find_post_ids_by_titles(self, titles: List[str]) -> Dict[str, str]:
+        # 标题 -> 文章 id；同名文章只取最早创建的一篇
+        titles = list(dict.fromkeys(titles))
+        if not titles:
+            return {}
+        placeholders = ",".join("?" * len(titles))
+        rows = self.database.fetch_all(
+            f"SELECT title, id FROM posts WHERE title IN ({placeholders}) ORDER BY created_at DESC",
+            tuple(titles),
+        )
+        return {row["title"]: row["id"] for row in rows}
+
+    def _store_post(self, post: Dict[str, Any], version: Tuple[str, str]) -> None:
+        with self._post_cache_lock:
+            self._post_cache[post["id"]] = (version, post)
+            self._post_cache.move_to_end(post["id"])
+            self._post_title_index[post["title"]] = post["id"]
+            while len(self._post_cache) > _POST_CACHE_SIZE:
+                _, (_, evicted) = self._post_cache.popitem(last=False)
+                if self._post_title_index.get(evicted["title"]) == evicted["id"]:
+                    del self._post_title_index[evicted["title"]]
+
+    def _evict_post(self, post_id: str) -> None:
+        with self._post_cache_lock:
+            self._password_hash_generation += 1
+            self._password_hash_cache.pop(post_id, None)
+            entry = self._post_cache.pop(post_id, None)
+            if entry is not None and self._post_title_index.get(entry[1]["title"]) == post_id:
+                del self._post_title_index[entry[1]["title"]]
 
     def find_post_by_title(self, title: str) -> Optional[Dict[str, Any]]:
+        post_id = self._post_title_index.get(title)
+        if post_id is not None:
+            post = self.get_post_by_id(post_id)
+            if post is not None and post["title"] == title:
+                return post
         row = self.database.fetch_one(
             """
             SELECT
@@ -323,7 +549,8 @@ class PostModel:
                 posts.updated_at,
                 users.display_name AS author_name,
                 users.username AS author_username,
-                users.is_vip AS author_is_vip
+                users.is_vip AS author_is_vip,
+                users.updated_at AS author_updated_at
             FROM posts
             INNER JOIN users ON users.id = posts.author_id
             WHERE posts.title = ?
@@ -332,18 +559,32 @@ class PostModel:
         )
         if row is None:
             return None
-        return self._map_post_detail(row)
+        post = self._map_post_detail(row)
+        self._store_post(post, (row["updated_at"], row["author_updated_at"]))
+        return post
 
     def verify_post_password(self, post_id: str, password: str) -> bool:
-        row = self.database.fetch_one(
-            """
-            SELECT password_hash FROM posts WHERE id = ?
-            """,
-            (post_id,),
-        )
-        if row is None or row["password_hash"] is None:
+        with self._post_cache_lock:
+            generation = self._password_hash_generation
+            cached_hash = self._password_hash_cache.get(post_id, _MISSING)
+        if cached_hash is not _MISSING:
+            stored_hash = cached_hash
+        else:
+            row = self.database.fetch_one(
+                """
+                SELECT password_hash FROM posts WHERE id = ?
+                """,
+                (post_id,),
+            )
+            if row is None:
+                return False
+            stored_hash = row["password_hash"]
+            with self._post_cache_lock:
+                if self._password_hash_generation == generation:
+                    self._password_hash_cache[post_id] = stored_hash
+        if stored_hash is None:
             return False
-        return self._hash_password(password) == row["password_hash"]
+        return hmac.compare_digest(_hash_password(password), stored_hash)
 
     def can_view_post(self, post: Dict[str, Any], user: Optional[Dict[str, Any]], has_password_access: bool) -> bool:
         permission = post.get("security", {}).get("permission_type", "public")
@@ -365,46 +606,51 @@ class PostModel:
         return post.get("author", {}).get("username") == user.get("username")
 
     def _map_post_summary(self, row: Any) -> Dict[str, Any]:
+        (
+            post_id,
+            title,
+            summary,
+            category,
+            tags,
+            cover_image,
+            created_at,
+            updated_at,
+            author_id,
+            author_name,
+            author_username,
+            author_is_vip,
+            permission_type,
+            password_hint,
+            password_hash,
+            allow_comments,
+            is_encrypted,
+        ) = _POST_SUMMARY_FIELDS(row)
         return {
-            "id": row["id"],
-            "title": row["title"],
-            "summary": row["summary"],
-            "category": row["category"],
-            "tags": row["tags"].split(",") if row["tags"] else [],
-            "cover_image": row["cover_image"],
-            "created_at": row["created_at"],
-            "updated_at": row["updated_at"],
+            "id": post_id,
+            "title": title,
+            "summary": summary,
+            "category": category,
+            "tags": _load_tags(tags),
+            "cover_image": cover_image,
+            "created_at": created_at,
+            "updated_at": updated_at,
             "author": {
-                "id": row["author_id"],
-                "display_name": row["author_name"],
-                "username": row["author_username"],
-                "is_vip": bool(row["author_is_vip"]),
+                "id": author_id,
+                "display_name": author_name,
+                "username": author_username,
+                "is_vip": bool(author_is_vip),
             },
             "security": {
-                "permission_type": row["permission_type"],
-                "password_hint": row["password_hint"],
-                "allow_comments": bool(row["allow_comments"]),
-                "is_encrypted": bool(row["is_encrypted"]),
-                "password_protected": row["permission_type"] == "password" and row["password_hash"] is not None,
+                "permission_type": permission_type,
+                "password_hint": password_hint,
+                "allow_comments": bool(allow_comments),
+                "is_encrypted": bool(is_encrypted),
+                "password_protected": permission_type == "password" and password_hash is not None,
             },
         }
 
     def _map_post_detail(self, row: Any) -> Dict[str, Any]:
+        # 详情与摘要的 security 字段完全一致，只需补上正文
         mapped = self._map_post_summary(row)
         mapped["content"] = row["content"]
-        mapped["security"] = {
-            "permission_type": row["permission_type"],
-            "password_hint": row["password_hint"],
-            "allow_comments": bool(row["allow_comments"]),
-            "is_encrypted": bool(row["is_encrypted"]),
-            "password_protected": row["permission_type"] == "password" and row["password_hash"] is not None,
-        }
         return mapped
-
-    def _hash_password(self, raw_password: Optional[str]) -> Optional[str]:
-        if raw_password is None:
-            return None
-        hasher = hashlib.sha256()
-        hasher.update(raw_password.encode("utf-8"))
-        return hasher.hexdigest()
-
@@ -1,7 +1,20 @@
-import hashlib
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from database import Database
+from security import hash_password, needs_rehash, verify_password
+
+
+_SQL_PRIVACY_SETTINGS = """
+    SELECT
+        users.id,
+        users.is_subscription_public AS "is_subscription_public [BOOLEAN]",
+        privacy.user_id AS privacy_user_id,
+        privacy.hide_posts AS "hide_posts [BOOLEAN]",
+        privacy.hide_favorites AS "hide_favorites [BOOLEAN]",
+        coalesce(privacy.access_password_hash, '') <> '' AS "has_password [BOOLEAN]"
+    FROM users
+    LEFT JOIN user_privacy_settings AS privacy ON privacy.user_id = users.id
+"""
 
 
 class PrivacyModel:
@@ -9,27 +22,29 @@ class PrivacyModel:
         self.database = database
 
     def get_privacy_settings(self, user_id: int) -> Dict[str, Any]:
-        try:
-            user_row = self.database.fetch_one(
-                """
-                SELECT is_subscription_public FROM users WHERE id = ?
-                """,
-                (user_id,),
-            )
-            is_subscription_public = True
-            if user_row:
-                is_subscription_public = bool(user_row.get("is_subscription_public", 1))
-        except Exception:
-            is_subscription_public = True
-        row = self.database.fetch_one(
-            """
-            SELECT hide_posts, hide_favorites, access_password_hash
-            FROM user_privacy_settings
-            WHERE user_id = ?
-            """,
-            (user_id,),
+        # 一次 LEFT JOIN 同时取 users 上的订阅公开开关与隐私设置行；没有隐私设置行时对应列为 NULL
+        row = self.database.fetch_one(_SQL_PRIVACY_SETTINGS + "WHERE users.id = ?", (user_id,))
+        return self._map_privacy_row(row)
+
+    def get_privacy_settings_many(self, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        # 列表页一次查询取多位用户的隐私设置；不存在的用户同样返回默认值
+        settings = {user_id: self._map_privacy_row(None) for user_id in user_ids}
+        if not settings:
+            return settings
+        placeholders = ",".join("?" * len(settings))
+        rows = self.database.fetch_all(
+            _SQL_PRIVACY_SETTINGS + f"WHERE users.id IN ({placeholders})",
+            tuple(settings),
         )
-        if row is None:
+        for row in rows:
+            settings[row["id"]] = self._map_privacy_row(row)
+        return settings
+
+    def _map_privacy_row(self, row: Any) -> Dict[str, Any]:
+        is_subscription_public = True
+        if row is not None and row["is_subscription_public"] is not None:
+            is_subscription_public = row["is_subscription_public"]
+        if row is None or row["privacy_user_id"] is None:
             return {
                 "hide_posts": False,
                 "hide_favorites": False,
@@ -37,9 +52,9 @@ class PrivacyModel:
                 "is_subscription_public": is_subscription_public,
             }
         return {
-            "hide_posts": bool(row["hide_posts"]),
-            "hide_favorites": bool(row["hide_favorites"]),
-            "has_password": bool(row["access_password_hash"]),
+            "hide_posts": row["hide_posts"],
+            "hide_favorites": row["hide_favorites"],
+            "has_password": row["has_password"],
             "is_subscription_public": is_subscription_public,
         }
 
@@ -53,45 +68,21 @@ class PrivacyModel:
     ) -> None:
         password_hash = None
         if access_password:
-            password_hash = self._hash_password(access_password)
-        self.database.execute(
-            """
-            UPDATE users
-            SET is_subscription_public = ?
-            WHERE id = ?
-            """,
-            (1 if is_subscription_public else 0, user_id),
-        )
-        existing = self.database.fetch_one(
-            """
-            SELECT user_id FROM user_privacy_settings WHERE user_id = ?
-            """,
-            (user_id,),
-        )
-        if existing:
-            if password_hash:
-                self.database.execute(
-                    """
-                    UPDATE user_privacy_settings
-                    SET hide_posts = ?, hide_favorites = ?, access_password_hash = ?
-                    WHERE user_id = ?
-                    """,
-                    (1 if hide_posts else 0, 1 if hide_favorites else 0, password_hash, user_id),
-                )
-            else:
-                self.database.execute(
-                    """
-                    UPDATE user_privacy_settings
-                    SET hide_posts = ?, hide_favorites = ?
-                    WHERE user_id = ?
-                    """,
-                    (1 if hide_posts else 0, 1 if hide_favorites else 0, user_id),
-                )
-        else:
-            self.database.execute(
+            password_hash = hash_password(access_password)
+        # 订阅公开开关与隐私设置在同一事务内写入；隐私设置用 UPSERT，未提供新访问密码时保留原值
+        with self.database.transaction() as cursor:
+            cursor.execute(
+                "UPDATE users SET is_subscription_public = ? WHERE id = ?",
+                (1 if is_subscription_public else 0, user_id),
+            )
+            cursor.execute(
                 """
                 INSERT INTO user_privacy_settings (user_id, hide_posts, hide_favorites, access_password_hash)
                 VALUES (?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    hide_posts = excluded.hide_posts,
+                    hide_favorites = excluded.hide_favorites,
+                    access_password_hash = COALESCE(excluded.access_password_hash, access_password_hash)
                 """,
                 (user_id, 1 if hide_posts else 0, 1 if hide_favorites else 0, password_hash),
             )
@@ -105,11 +96,15 @@ class PrivacyModel:
         )
         if not row or not row["access_password_hash"]:
             return False
-        provided_hash = self._hash_password(password)
-        return provided_hash == row["access_password_hash"]
-
-    def _hash_password(self, raw_password: str) -> str:
-        hasher = hashlib.sha256()
-        hasher.update(raw_password.encode("utf-8"))
-        return hasher.hexdigest()
+        stored_hash = row["access_password_hash"]
+        if not verify_password(password, stored_hash):
+            return False
+        if needs_rehash(stored_hash):
+            self.database.execute(
+                """
+                UPDATE user_privacy_settings SET access_password_hash = ? WHERE user_id = ?
+                """,
+                (hash_password(password), user_id),
+            )
+        return True
 
@@ -1,46 +1,68 @@
-import uuid
-from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+from os import urandom
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from database import Database
+from timeutil import utc_now_iso
+
+
+_SQL_LIST_AUTHOR_SUBSCRIBERS = """
+    SELECT user_id
+    FROM subscriptions
+    WHERE subscription_type = 'author' AND subscription_value = ?
+"""
+# COUNT(*) 总有一行结果，按位置取值
+_SQL_COUNT_AUTHOR_SUBSCRIBERS = (
+    "SELECT COUNT(*) FROM subscriptions WHERE subscription_type = 'author' AND subscription_value = ?"
+)
+_SQL_COUNT_USER_SUBSCRIPTIONS = "SELECT COUNT(*) FROM subscriptions WHERE user_id = ?"
+_SQL_COUNT_USER_SUBSCRIPTIONS_BY_TYPE = "SELECT COUNT(*) FROM subscriptions WHERE user_id = ? AND subscription_type = ?"
+_SQL_DELETE_SUBSCRIPTION = "DELETE FROM subscriptions WHERE id = ? RETURNING subscription_type, subscription_value"
+_SQL_NOTIFY_AUTHOR_SUBSCRIBERS = """
+    INSERT INTO notifications (id, user_id, message, type, is_read, created_at)
+    SELECT lower(hex(randomblob(16))), subscriptions.user_id, ?, 'author_update', 0, ?
+    FROM subscriptions
+    WHERE subscriptions.subscription_type = 'author'
+      AND subscriptions.subscription_value = ?
+      AND subscriptions.user_id IS NOT ?
+"""
+
+# 作者订阅数缓存：键为作者用户名，值为 (订阅数, 过期时间)；订阅变更时立即失效，TTL 兜底其他写入路径
+_SUBSCRIBER_COUNT_TTL_SECONDS = 30.0
+_SUBSCRIBER_COUNT_CACHE_SIZE = 4096
 
 
 class SubscriptionModel:
     def __init__(self, database: Database) -> None:
         self.database = database
+        self._subscriber_counts: Dict[str, Tuple[int, float]] = {}
+        self._subscriber_counts_lock = threading.Lock()
 
     def add_subscription(self, user_id: int, subscription_type: str, subscription_value: str) -> None:
-        existing = self.database.fetch_one(
-            """
-            SELECT id FROM subscriptions
-            WHERE user_id = ? AND subscription_type = ? AND subscription_value = ?
-            """,
-            (user_id, subscription_type, subscription_value),
-        )
-        if existing is not None:
-            return
-        now = datetime.utcnow().isoformat()
+        # 已订阅时由唯一索引 ux_subscriptions_user_value 忽略本次插入
+        now = utc_now_iso()
         self.database.execute(
             """
-            INSERT INTO subscriptions (id, user_id, subscription_type, subscription_value, created_at)
+            INSERT OR IGNORE INTO subscriptions (id, user_id, subscription_type, subscription_value, created_at)
             VALUES (?, ?, ?, ?, ?)
             """,
             (
-                uuid.uuid4().hex,
+                urandom(16).hex(),
                 user_id,
                 subscription_type,
                 subscription_value,
                 now,
             ),
         )
+        self._invalidate_subscriber_count(subscription_type, subscription_value)
 
     def remove_subscription(self, subscription_id: str) -> None:
-        self.database.execute(
-            """
-            DELETE FROM subscriptions WHERE id = ?
-            """,
-            (subscription_id,),
+        row = self.database.transactional(
+            lambda cursor: cursor.execute(_SQL_DELETE_SUBSCRIPTION, (subscription_id,)).fetchone()
         )
+        if row is not None:
+            self._invalidate_subscriber_count(row["subscription_type"], row["subscription_value"])
 
     def remove_subscription_by_value(self, user_id: int, subscription_type: str, subscription_value: str) -> None:
         self.database.execute(
@@ -50,9 +72,19 @@ class SubscriptionModel:
             """,
             (user_id, subscription_type, subscription_value),
         )
+        self._invalidate_subscriber_count(subscription_type, subscription_value)
+
+    def _invalidate_subscriber_count(self, subscription_type: str, subscription_value: str) -> None:
+        if subscription_type != "author":
+            return
+        with self._subscriber_counts_lock:
+            self._subscriber_counts.pop(subscription_value, None)
 
     def list_subscriptions(self, user_id: int) -> List[Dict[str, Any]]:
-        rows = self.database.fetch_all(
+        return list(self.iter_subscriptions(user_id))
+
+    def iter_subscriptions(self, user_id: int) -> Iterator[Dict[str, Any]]:
+        rows = self.database.iter_rows(
             """
             SELECT id, subscription_type, subscription_value, created_at
             FROM subscriptions
@@ -61,44 +93,34 @@ class SubscriptionModel:
             """,
             (user_id,),
         )
-        subscriptions: List[Dict[str, Any]] = []
         for row in rows:
-            subscriptions.append(
-                {
-                    "id": row["id"],
-                    "type": row["subscription_type"],
-                    "value": row["subscription_value"],
-                    "created_at": row["created_at"],
-                }
-            )
-        return subscriptions
+            yield {
+                "id": row["id"],
+                "type": row["subscription_type"],
+                "value": row["subscription_value"],
+                "created_at": row["created_at"],
+            }
 
     def list_author_subscribers(self, author_username: str) -> List[int]:
-        rows = self.database.fetch_all(
-            """
-            SELECT user_id
-            FROM subscriptions
-            WHERE subscription_type = 'author' AND subscription_value = ?
-            """,
-            (author_username,),
-        )
-        subscriber_ids: List[int] = []
-        for row in rows:
-            subscriber_ids.append(row["user_id"])
-        return subscriber_ids
+        return list(self.iter_author_subscribers(author_username))
+
+    def iter_author_subscribers(self, author_username: str) -> Iterator[int]:
+        for row in self.database.iter_rows(_SQL_LIST_AUTHOR_SUBSCRIBERS, (author_username,)):
+            yield row["user_id"]
 
     def get_subscriber_count(self, author_username: str) -> int:
-        row = self.database.fetch_one(
-            """
-            SELECT COUNT(*) as count
-            FROM subscriptions
-            WHERE subscription_type = 'author' AND subscription_value = ?
-            """,
-            (author_username,),
-        )
-        if row is None:
-            return 0
-        return row["count"] or 0
+        now = time.monotonic()
+        cached = self._subscriber_counts.get(author_username)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+        row = self.database.fetch_one(_SQL_COUNT_AUTHOR_SUBSCRIBERS, (author_username,))
+        count = row[0] if row else 0
+        with self._subscriber_counts_lock:
+            if len(self._subscriber_counts) >= _SUBSCRIBER_COUNT_CACHE_SIZE:
+                # 容量满时丢弃最早写入的一项
+                self._subscriber_counts.pop(next(iter(self._subscriber_counts)), None)
+            self._subscriber_counts[author_username] = (count, now + _SUBSCRIBER_COUNT_TTL_SECONDS)
+        return count
 
     def is_subscribed(self, user_id: int, subscription_type: str, subscription_value: str) -> bool:
         row = self.database.fetch_one(
@@ -112,26 +134,10 @@ class SubscriptionModel:
 
     def get_subscription_count(self, user_id: int, subscription_type: Optional[str] = None) -> int:
         if subscription_type:
-            row = self.database.fetch_one(
-                """
-                SELECT COUNT(*) as count
-                FROM subscriptions
-                WHERE user_id = ? AND subscription_type = ?
-                """,
-                (user_id, subscription_type),
-            )
+            row = self.database.fetch_one(_SQL_COUNT_USER_SUBSCRIPTIONS_BY_TYPE, (user_id, subscription_type))
         else:
-            row = self.database.fetch_one(
-                """
-                SELECT COUNT(*) as count
-                FROM subscriptions
-                WHERE user_id = ?
-                """,
-                (user_id,),
-            )
-        if row is None:
-            return 0
-        return row["count"] or 0
+            row = self.database.fetch_one(_SQL_COUNT_USER_SUBSCRIPTIONS, (user_id,))
+        return row[0] if row else 0
 
     def notify_author_subscribers(
         self,
@@ -141,31 +147,9 @@ class SubscriptionModel:
         post_id: str,
         exclude_user_id: Optional[int] = None,
     ) -> None:
-        subscriber_ids = self.list_author_subscribers(author_username)
-        if not subscriber_ids:
-            return
-        now = datetime.utcnow().isoformat()
-        notifications: List[Tuple[str, int, str, str, int, str]] = []
-        message = f"{author_display_name} 发布了新文章《{post_title}》"
-        for subscriber_id in subscriber_ids:
-            if exclude_user_id is not None and subscriber_id == exclude_user_id:
-                continue
-            notifications.append(
-                (
-                    uuid.uuid4().hex,
-                    subscriber_id,
-                    f"{message}，点击查看：/posts/{post_id}",
-                    "author_update",
-                    0,
-                    now,
-                )
-            )
-        if notifications:
-            self.database.execute_many(
-                """
-                INSERT INTO notifications (id, user_id, message, type, is_read, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                notifications,
-            )
-
+        # 每位订阅者收到的通知文本相同；INSERT ... SELECT 在 SQLite 内逐行生成通知，订阅者 id 不经过 Python
+        message = f"{author_display_name} 发布了新文章《{post_title}》，点击查看：/posts/{post_id}"
+        self.database.execute(
+            _SQL_NOTIFY_AUTHOR_SUBSCRIBERS,
+            (message, utc_now_iso(), author_username, exclude_user_id),
+        )
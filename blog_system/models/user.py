@@ -1,9 +1,16 @@
-import hashlib
-import uuid
-from datetime import datetime
-from typing import Optional, Dict, Any, List
+import secrets
+from operator import itemgetter
+from os import urandom
+from typing import Optional, Dict, Any, Iterator, List
 
 from database import Database
+from querycache import cached, invalidate
+from security import hash_password, needs_rehash, verify_password
+from timeutil import utc_now_iso
+
+
+_USER_KEYS = ("id", "username", "display_name", "email", "bio", "role", "is_vip", "created_at", "updated_at")
+_get_user_fields = itemgetter(*_USER_KEYS)
 
 
 class UserModel:
@@ -15,8 +22,8 @@ class UserModel:
             return False
         if display_name is None:
             display_name = username
-        now = datetime.utcnow().isoformat()
-        password_hash = self._hash_password(password)
+        now = utc_now_iso()
+        password_hash = hash_password(password)
         self.database.execute(
             """
             INSERT INTO users (username, password_hash, display_name, email, bio, avatar_url, role, is_vip, created_at, updated_at)
@@ -35,10 +42,11 @@ class UserModel:
                 now,
             ),
         )
+        invalidate("users")
         return True
 
     def update_profile(self, user_id: int, display_name: str, bio: str, email: Optional[str], is_vip: bool) -> None:
-        now = datetime.utcnow().isoformat()
+        now = utc_now_iso()
         self.database.execute(
             """
             UPDATE users
@@ -54,24 +62,28 @@ class UserModel:
                 user_id,
             ),
         )
+        # 文章列表带有作者显示名与 VIP 标记
+        invalidate("users", "posts")
 
     def list_users(self) -> List[Dict[str, Any]]:
-        rows = self.database.fetch_all(
+        return list(self.iter_users())
+
+    def iter_users(self) -> Iterator[Dict[str, Any]]:
+        rows = self.database.iter_rows(
             """
-            SELECT id, username, display_name, email, bio, role, is_vip, created_at, updated_at
+            SELECT id, username, display_name, email, bio, role, is_vip AS "is_vip [BOOLEAN]", created_at, updated_at
             FROM users
             ORDER BY created_at DESC
             """
         )
-        result: List[Dict[str, Any]] = []
         for row in rows:
-            result.append(self._map_user_row(row))
-        return result
+            yield self._map_user_row(row)
 
+    @cached(tags=("users",))
     def get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
         row = self.database.fetch_one(
             """
-            SELECT id, username, password_hash, display_name, email, bio, role, is_vip, created_at, updated_at
+            SELECT id, username, password_hash, display_name, email, bio, role, is_vip AS "is_vip [BOOLEAN]", created_at, updated_at
             FROM users
             WHERE username = ?
             """,
@@ -84,7 +96,7 @@ class UserModel:
     def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
         row = self.database.fetch_one(
             """
-            SELECT id, username, password_hash, display_name, email, bio, role, is_vip, created_at, updated_at
+            SELECT id, username, password_hash, display_name, email, bio, role, is_vip AS "is_vip [BOOLEAN]", created_at, updated_at
             FROM users
             WHERE id = ?
             """,
@@ -94,6 +106,25 @@ class UserModel:
             return None
         return self._map_user_row(row, include_password=True)
 
+    def get_users_by_usernames(self, usernames: List[str]) -> Dict[str, Dict[str, Any]]:
+        return self._get_users_by_column("username", usernames)
+
+    def _get_users_by_column(self, column: str, values: List[Any]) -> Dict[Any, Dict[str, Any]]:
+        # 列表渲染时一次 IN 查询取回全部用户，避免逐条查询
+        keys = list(dict.fromkeys(values))
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        rows = self.database.fetch_all(
+            f"""
+            SELECT id, username, display_name, email, bio, role, is_vip AS "is_vip [BOOLEAN]", created_at, updated_at
+            FROM users
+            WHERE {column} IN ({placeholders})
+            """,
+            tuple(keys),
+        )
+        return {row[column]: self._map_user_row(row) for row in rows}
+
     def verify_password(self, username: str, password: str) -> Optional[Dict[str, Any]]:
         user = self.get_user_by_username(username)
         if user is None:
@@ -101,13 +132,15 @@ class UserModel:
         expected_hash = user.get("password_hash")
         if expected_hash is None:
             return None
-        provided_hash = self._hash_password(password)
-        if expected_hash != provided_hash:
+        if not verify_password(password, expected_hash):
             return None
+        if needs_rehash(expected_hash):
+            # 旧的无盐 SHA-256 摘要在登录成功时升级为 PBKDF2
+            self.update_password(user["id"], password)
         return user
 
     def upgrade_role(self, user_id: int, role: str) -> None:
-        now = datetime.utcnow().isoformat()
+        now = utc_now_iso()
         self.database.execute(
             """
             UPDATE users
@@ -116,9 +149,10 @@ class UserModel:
             """,
             (role, now, user_id),
         )
+        invalidate("users")
 
     def set_vip_status(self, user_id: int, vip: bool) -> None:
-        now = datetime.utcnow().isoformat()
+        now = utc_now_iso()
         self.database.execute(
             """
             UPDATE users
@@ -127,17 +161,19 @@ class UserModel:
             """,
             (1 if vip else 0, now, user_id),
         )
+        invalidate("users", "posts")
 
     def generate_password_token(self, user_id: int) -> str:
-        token = uuid.uuid4().hex
-        now = datetime.utcnow().isoformat()
+        # 重置令牌是凭据，用 secrets 生成；格式仍为 32 位十六进制
+        token = secrets.token_hex(16)
+        now = utc_now_iso()
         self.database.execute(
             """
             INSERT INTO notifications (id, user_id, message, type, is_read, created_at)
             VALUES (?, ?, ?, ?, ?, ?)
             """,
             (
-                uuid.uuid4().hex,
+                urandom(16).hex(),
                 user_id,
                 f"重置密码令牌：{token}",
                 "password_reset",
@@ -148,8 +184,8 @@ class UserModel:
         return token
 
     def update_password(self, user_id: int, new_password: str) -> None:
-        now = datetime.utcnow().isoformat()
-        password_hash = self._hash_password(new_password)
+        now = utc_now_iso()
+        password_hash = hash_password(new_password)
         self.database.execute(
             """
             UPDATE users
@@ -158,24 +194,11 @@ class UserModel:
             """,
             (password_hash, now, user_id),
         )
-
-    def _hash_password(self, raw_password: str) -> str:
-        hasher = hashlib.sha256()
-        hasher.update(raw_password.encode("utf-8"))
-        return hasher.hexdigest()
+        invalidate("users")
 
     def _map_user_row(self, row: Any, include_password: bool = False) -> Dict[str, Any]:
-        user_dict: Dict[str, Any] = {
-            "id": row["id"],
-            "username": row["username"],
-            "display_name": row["display_name"],
-            "email": row["email"],
-            "bio": row["bio"],
-            "role": row["role"],
-            "is_vip": bool(row["is_vip"]),
-            "created_at": row["created_at"],
-            "updated_at": row["updated_at"],
-        }
+        # is_vip 由查询中的 [BOOLEAN] 列名转换器直接给出 bool
+        user_dict: Dict[str, Any] = dict(zip(_USER_KEYS, _get_user_fields(row)))
         if include_password:
             user_dict["password_hash"] = row["password_hash"]
         return user_dict
@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Tuple
+
+
+# 标签版本号：写操作调用 invalidate() 递增，缓存条目记录写入时的版本，版本不一致即视为失效
+_tag_versions: Dict[str, int] = {}
+_tag_lock = threading.Lock()
+
+
+def invalidate(*tags: str) -> None:
+    with _tag_lock:
+        for tag in tags:
+            _tag_versions[tag] = _tag_versions.get(tag, 0) + 1
+
+
+def _freeze(value: Any) -> Any:
+    # 参数中的 dict/list（过滤条件、当前用户）转换为可哈希的元组作为缓存键
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def _copy(value: Any) -> Any:
+    # 返回列表的浅拷贝，调用方增删列表元素不会影响缓存；元素本身共享，调用方不应修改
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, tuple):
+        return tuple(_copy(item) for item in value)
+    return value
+
+
+def cached(ttl: float = 2.0, maxsize: int = 256, tags: Tuple[str, ...] = ()) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        entries: "OrderedDict[Any, Tuple[float, Tuple[int, ...], Any]]" = OrderedDict()
+        lock = threading.Lock()
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                key = (_freeze(args), _freeze(kwargs))
+                hash(key)
+            except TypeError:
+                return func(*args, **kwargs)
+            # 先取版本再查询：查询期间发生写入时，存入的旧版本条目下次读取即失效
+            versions = tuple(_tag_versions.get(tag, 0) for tag in tags)
+            now = time.monotonic()
+            with lock:
+                entry = entries.get(key)
+                if entry is not None and entry[0] > now and entry[1] == versions:
+                    entries.move_to_end(key)
+                    return _copy(entry[2])
+            result = func(*args, **kwargs)
+            with lock:
+                entries[key] = (now + ttl, versions, result)
+                entries.move_to_end(key)
+                if len(entries) > maxsize:
+                    entries.popitem(last=False)
+            return _copy(result)
+
+        return wrapper
+
+    return decorator
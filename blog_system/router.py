@@ -1,50 +1,111 @@
-from typing import Callable, Dict, Any, Optional, List
+import sys
+from functools import lru_cache
+from typing import Callable, Dict, Any, Optional, List, Tuple
+
+
+# 已是大写的常见方法直接用于查表，其余先规范化
+_KNOWN_METHODS = frozenset(("GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"))
+
+
+@lru_cache(maxsize=1024)
+def _split_path(path: str) -> Tuple[str, ...]:
+    if path == "/":
+        return ()
+    return tuple(segment for segment in path.strip("/").split("/") if segment)
 
 
 class RouteMatch:
-    def __init__(self, handler: Callable[..., "HTTPResponse"], params: Dict[str, Any]) -> None:
+    # 无参数路由的 params 为 None，调用处据此跳过 ** 解包
+    def __init__(self, handler: Callable[..., "HTTPResponse"], params: Optional[Dict[str, Any]]) -> None:
         self.handler = handler
         self.params = params
 
 
+class _TrieNode:
+    __slots__ = ("children", "param_child", "handlers")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_TrieNode"] = {}
+        # 参数段（<name>）共用一个子节点；参数名记在叶子上，同一位置不同路由可以使用不同的参数名
+        self.param_child: Optional["_TrieNode"] = None
+        # 方法 -> (注册序号, 处理函数, 参数名)
+        self.handlers: Dict[str, Tuple[int, Callable[..., "HTTPResponse"], Tuple[str, ...]]] = {}
+
+
 class Router:
     def __init__(self) -> None:
         self.routes: List[Dict[str, Any]] = []
+        self._root = _TrieNode()
+        # 无参数路由的快捷表：(规范化路径, 方法) -> 处理函数，命中时不必遍历前缀树
+        self._static: Dict[Tuple[str, str], Callable[..., "HTTPResponse"]] = {}
 
     def add_route(self, path: str, method: str, handler: Callable[..., "HTTPResponse"]) -> None:
         entry = {
             "path": path,
-            "method": method.upper(),
+            "method": sys.intern(method.upper()),
             "handler": handler,
-            "segments": self._split_path(path),
+            "segments": _split_path(path),
         }
+        segments = entry["segments"]
+        if not any(segment.startswith("<") and segment.endswith(">") for segment in segments):
+            # 先注册的参数路由若已能匹配该路径，则仍由它处理，不加入快捷表
+            if _search(self._root, segments, 0, entry["method"], []) is None:
+                self._static["/" + "/".join(segments), entry["method"]] = handler
+        node = self._root
+        names: List[str] = []
+        for segment in entry["segments"]:
+            if segment.startswith("<") and segment.endswith(">"):
+                if node.param_child is None:
+                    node.param_child = _TrieNode()
+                node = node.param_child
+                names.append(segment[1:-1])
+            else:
+                child = node.children.get(segment)
+                if child is None:
+                    child = node.children[segment] = _TrieNode()
+                node = child
+        # 同一路径同一方法重复注册时保留先注册的
+        node.handlers.setdefault(entry["method"], (len(self.routes), handler, tuple(names)))
         self.routes.append(entry)
 
     def resolve(self, path: str, method: str) -> Optional[RouteMatch]:
-        request_segments = self._split_path(path)
-        for route in self.routes:
-            if route["method"] != method.upper():
-                continue
-            params: Dict[str, Any] = {}
-            if self._match_segments(route["segments"], request_segments, params):
-                return RouteMatch(route["handler"], params)
-        return None
-
-    def _split_path(self, path: str) -> List[str]:
-        if path == "/":
-            return []
-        return [segment for segment in path.strip("/").split("/") if segment]
-
-    def _match_segments(self, route_segments: List[str], request_segments: List[str], params: Dict[str, Any]) -> bool:
-        if len(route_segments) != len(request_segments):
-            return False
-        for route_segment, request_segment in zip(route_segments, request_segments):
-            if route_segment.startswith("<") and route_segment.endswith(">"):
-                key = route_segment[1:-1]
-                params[key] = request_segment
-            elif route_segment == request_segment:
-                continue
-            else:
-                return False
-        return True
+        if method not in _KNOWN_METHODS:
+            method = sys.intern(method.upper())
+        handler = self._static.get((path, method))
+        if handler is not None:
+            return RouteMatch(handler, None)
+        segments = _split_path(path)
+        found = _search(self._root, segments, 0, method, [])
+        if found is None:
+            return None
+        _, handler, names, values = found
+        if not names:
+            return RouteMatch(handler, None)
+        return RouteMatch(handler, dict(zip(names, values)))
+
 
+def _search(
+    node: _TrieNode,
+    segments: Tuple[str, ...],
+    depth: int,
+    method: str,
+    values: List[str],
+) -> Optional[Tuple[int, Callable[..., "HTTPResponse"], Tuple[str, ...], List[str]]]:
+    # 静态子节点与参数子节点都可能匹配时两边都查，取注册序号最小的路由，与原先按注册顺序逐条匹配的结果一致
+    if depth == len(segments):
+        leaf = node.handlers.get(method)
+        if leaf is None:
+            return None
+        return leaf[0], leaf[1], leaf[2], list(values)
+    segment = segments[depth]
+    best = None
+    child = node.children.get(segment)
+    if child is not None:
+        best = _search(child, segments, depth + 1, method, values)
+    if node.param_child is not None:
+        values.append(segment)
+        candidate = _search(node.param_child, segments, depth + 1, method, values)
+        values.pop()
+        if candidate is not None and (best is None or candidate[0] < best[0]):
+            best = candidate
+    return best
@@ -0,0 +1,38 @@
+import hmac
+import os
+from hashlib import pbkdf2_hmac as _pbkdf2_hmac
+from hashlib import sha256 as _sha256
+
+
+# 存储格式：pbkdf2_sha256$迭代次数$盐(hex)$摘要(hex)。迭代次数随哈希一起保存，日后调高不影响旧密码校验
+_PBKDF2_ALGORITHM = "pbkdf2_sha256"
+_PBKDF2_ITERATIONS = 200_000
+_SALT_BYTES = 16
+
+
+def hash_password(raw_password: str) -> str:
+    # 用户登录密码与主页访问密码共用：每个密码单独随机加盐，PBKDF2 的迭代全部在 OpenSSL 内完成
+    salt = os.urandom(_SALT_BYTES)
+    digest = _pbkdf2_hmac("sha256", raw_password.encode("utf-8"), salt, _PBKDF2_ITERATIONS)
+    return f"{_PBKDF2_ALGORITHM}${_PBKDF2_ITERATIONS}${salt.hex()}${digest.hex()}"
+
+
+def verify_password(raw_password: str, stored_hash: str) -> bool:
+    encoded = raw_password.encode("utf-8")
+    if stored_hash.startswith(_PBKDF2_ALGORITHM + "$"):
+        try:
+            _, iterations, salt_hex, digest_hex = stored_hash.split("$")
+            salt = bytes.fromhex(salt_hex)
+            expected = bytes.fromhex(digest_hex)
+            rounds = int(iterations)
+        except ValueError:
+            return False
+        return hmac.compare_digest(_pbkdf2_hmac("sha256", encoded, salt, rounds), expected)
+    # 旧数据：无盐 SHA-256 十六进制摘要
+    return hmac.compare_digest(_sha256(encoded).hexdigest(), stored_hash)
+
+
+def needs_rehash(stored_hash: str) -> bool:
+    # 旧格式或迭代次数低于当前设置的哈希，应在下次校验成功后用明文重新生成
+    prefix = f"{_PBKDF2_ALGORITHM}${_PBKDF2_ITERATIONS}$"
+    return not stored_hash.startswith(prefix)
@@ -1,9 +1,13 @@
 import os
+import queue
+import selectors
 import socket
+import stat
 import threading
 import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from router import Router
 from handlers import TemplateRenderer, BasicHandlers, UserHandlers, ArticleHandlers, SubscriptionHandlers, MessageHandlers
@@ -30,13 +34,104 @@ from session import SessionManager
 from models.pokemon import PokemonModel
 
 
+# 静态文件响应缓存：条目数上限与单个文件大小上限（超过的文件每次从磁盘读取）
+_STATIC_CACHE_SIZE = 64
+_STATIC_CACHE_MAX_BYTES = 1024 * 1024
+
+_CONTENT_TYPES = {
+    ".css": "text/css; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".ico": "image/x-icon",
+}
+
+# 处理请求的固定线程数；请求数据已到达但没有空闲线程的连接在 _connections 队列中排队
+_WORKER_THREADS = min(32, (os.cpu_count() or 1) * 4)
+# 从连接建立（或长连接上一个响应之后开始收到新请求）到收完整个请求的总时限（秒），按截止时间计算而不是单次 recv；
+# 只连不发或逐字节慢速发送的客户端到时即被断开，不会一直占用工作线程
+_REQUEST_TIMEOUT = 10
+_LISTEN_BACKLOG = 128
+_RECV_BUFFER_SIZE = 65536
+
+# HTTP 长连接：空闲超时（秒）与单个连接最多处理的请求数
+_KEEP_ALIVE_TIMEOUT = 5
+_KEEP_ALIVE_MAX_REQUESTS = 100
+_KEEP_ALIVE_HEADER = f"timeout={_KEEP_ALIVE_TIMEOUT}, max={_KEEP_ALIVE_MAX_REQUESTS}"
+
+
+class _PrebuiltResponse(HTTPResponse):
+    # 内容固定的响应：头部在构造时按关闭/保持连接两种情况各序列化一次；实例在请求间共享，不应再修改
+    def __init__(self, status_code: int, reason: str, body: bytes, headers: Dict[str, str]) -> None:
+        super().__init__(status_code, reason, body, headers)
+        self._heads = {
+            None: super().head_bytes(),
+            _KEEP_ALIVE_HEADER: super().head_bytes(_KEEP_ALIVE_HEADER),
+        }
+
+    def head_bytes(self, keep_alive: Optional[str] = None) -> bytes:
+        head = self._heads.get(keep_alive)
+        if head is None:
+            head = super().head_bytes(keep_alive)
+        return head
+
+
+def _plain_text_response(status_code: int, reason: str, body: bytes) -> _PrebuiltResponse:
+    headers = {
+        "Content-Type": "text/plain; charset=utf-8",
+        "Content-Length": str(len(body)),
+        "Connection": "close",
+    }
+    return _PrebuiltResponse(status_code, reason, body, headers)
+
+
+if hasattr(socket.socket, "sendmsg"):
+    def _send_buffers(client_socket: socket.socket, buffers: List[bytes]) -> None:
+        # sendmsg 可能只写出一部分，按已发送字节数推进，剩余部分用 memoryview 切片继续发送
+        views = [memoryview(buffer) for buffer in buffers if buffer]
+        while views:
+            sent = client_socket.sendmsg(views)
+            while sent:
+                first = views[0]
+                if sent >= len(first):
+                    sent -= len(first)
+                    del views[0]
+                else:
+                    views[0] = first[sent:]
+                    sent = 0
+else:
+    def _send_buffers(client_socket: socket.socket, buffers: List[bytes]) -> None:
+        client_socket.sendall(b"".join(buffers))
+
+
+class _Connection:
+    # 一个客户端连接在多次请求之间的状态：未处理完的已接收数据、已处理请求数、空闲截止时间
+    __slots__ = ("sock", "buffer", "served", "deadline")
+
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+        self.buffer = bytearray()
+        self.served = 0
+        self.deadline = 0.0
+
 
 class HTTPServer:
     def __init__(self, host: str = "127.0.0.1", port: int = 8080) -> None:
         self.host = host
         self.port = port
         self.router = Router()
-        self.static_root = os.path.join(os.path.dirname(__file__), "static")
+        self._resp_403 = _plain_text_response(403, "Forbidden", b"403 Forbidden")
+        self._resp_404 = _plain_text_response(404, "Not Found", b"404 Not Found")
+        # 已接受、待处理的连接；工作线程为守护线程，进程退出时不等待阻塞在空闲连接上的线程
+        self._connections: "queue.Queue[_Connection]" = queue.Queue()
+        # 工作线程交还的空闲长连接，由监听线程重新登记到 selector（selector 只在监听线程中操作）
+        self._parked: "queue.Queue[_Connection]" = queue.Queue()
+        self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+        self.static_root = os.path.realpath(os.path.join(os.path.dirname(__file__), "static"))
+        # 请求路径 -> (绝对路径, mtime_ns, 文件大小, 预先序列化头部的响应)
+        self._static_cache: "OrderedDict[str, Tuple[str, int, int, _PrebuiltResponse]]" = OrderedDict()
+        self._static_cache_lock = threading.Lock()
         self.template_root = os.path.join(os.path.dirname(__file__), "templates")
         data_path = os.path.join(os.path.dirname(__file__), "data", "blog_system.sqlite3")
         self.database = get_database(data_path)
@@ -150,87 +245,222 @@ class HTTPServer:
         # === 功能 2：网络性能 (已在原代码的 /api/performance/metrics 中，这里确保前端能调到) ===
         # 原代码已包含: self.router.add_route("/api/performance/metrics", "GET", self.performance_api.list_metrics)
     def serve_static(self, path: str) -> Optional[HTTPResponse]:
-        normalized = os.path.normpath(path).lstrip("/")
-        absolute_path = os.path.join(self.static_root, normalized)
-        if not absolute_path.startswith(self.static_root):
+        with self._static_cache_lock:
+            cached = self._static_cache.get(path)
+            if cached is not None:
+                self._static_cache.move_to_end(path)
+        if cached is not None:
+            absolute_path, mtime_ns, size, response = cached
+            try:
+                file_stat = os.stat(absolute_path)
+            except OSError:
+                file_stat = None
+            if file_stat is not None and file_stat.st_mtime_ns == mtime_ns and file_stat.st_size == size:
+                return response
+        # 解析符号链接和 ".." 之后再确认仍位于静态目录内
+        absolute_path = os.path.realpath(os.path.join(self.static_root, path.lstrip("/")))
+        if not absolute_path.startswith(self.static_root + os.sep):
             return self._forbidden()
-        if not os.path.exists(absolute_path) or not os.path.isfile(absolute_path):
+        try:
+            file_stat = os.stat(absolute_path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(file_stat.st_mode):
             return None
+        content_type = self._guess_content_type(absolute_path)
+        if file_stat.st_size > _STATIC_CACHE_MAX_BYTES:
+            # 大文件不缓存也不读入内存，长度取自 stat，正文发送时用 sendfile
+            headers = {
+                "Content-Type": content_type,
+                "Content-Length": str(file_stat.st_size),
+                "Connection": "close",
+            }
+            return HTTPResponse(200, "OK", b"", headers, file_path=absolute_path)
         with open(absolute_path, "rb") as file_handler:
             data = file_handler.read()
-        content_type = self._guess_content_type(absolute_path)
         headers = {
             "Content-Type": content_type,
             "Content-Length": str(len(data)),
             "Connection": "close",
         }
-        return HTTPResponse(200, "OK", data, headers)
+        # 静态文件请求不经过处理函数，缓存的响应对象直接交给发送逻辑，不会被修改
+        response = _PrebuiltResponse(200, "OK", data, headers)
+        with self._static_cache_lock:
+            self._static_cache[path] = (absolute_path, file_stat.st_mtime_ns, len(data), response)
+            self._static_cache.move_to_end(path)
+            if len(self._static_cache) > _STATIC_CACHE_SIZE:
+                self._static_cache.popitem(last=False)
+        return response
 
     def _guess_content_type(self, path: str) -> str:
-        if path.endswith(".css"):
-            return "text/css; charset=utf-8"
-        if path.endswith(".js"):
-            return "application/javascript; charset=utf-8"
-        if path.endswith(".png"):
-            return "image/png"
-        if path.endswith(".jpg") or path.endswith(".jpeg"):
-            return "image/jpeg"
-        if path.endswith(".ico"):
-            return "image/x-icon"
-        return "application/octet-stream"
+        return _CONTENT_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
 
     def _forbidden(self) -> HTTPResponse:
-        body = b"403 Forbidden"
-        headers = {
-            "Content-Type": "text/plain; charset=utf-8",
-            "Content-Length": str(len(body)),
-            "Connection": "close",
-        }
-        return HTTPResponse(403, "Forbidden", body, headers)
+        return self._resp_403
 
     def start(self) -> None:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
             server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             server_socket.bind((self.host, self.port))
-            server_socket.listen(5)
+            server_socket.listen(_LISTEN_BACKLOG)
             print(f"Server running on http://{self.host}:{self.port}")
+            for index in range(_WORKER_THREADS):
+                worker = threading.Thread(target=self._worker_loop, name=f"http-{index}", daemon=True)
+                worker.start()
+            self._serve_forever(server_socket)
+
+    def _serve_forever(self, server_socket: socket.socket) -> None:
+        # 监听线程用 selector 等待：新连接和空闲的长连接都在这里等到有数据可读才交给工作线程，
+        # 工作线程只处理已经到达的请求，不会阻塞在空闲连接上
+        selector = selectors.DefaultSelector()
+        selector.register(server_socket, selectors.EVENT_READ)
+        self._wakeup_reader.setblocking(False)
+        selector.register(self._wakeup_reader, selectors.EVENT_READ)
+        next_sweep = time.monotonic() + 1.0
+        while True:
+            for key, _ in selector.select(timeout=1.0):
+                if key.fileobj is server_socket:
+                    client_socket, _ = server_socket.accept()
+                    # 响应一次 sendall 写完，关闭 Nagle 避免小响应等待合并；接收缓冲交给内核自动调节
+                    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    client_socket.settimeout(_REQUEST_TIMEOUT)
+                    connection = _Connection(client_socket)
+                    connection.deadline = time.monotonic() + _REQUEST_TIMEOUT
+                    selector.register(client_socket, selectors.EVENT_READ, connection)
+                elif key.fileobj is self._wakeup_reader:
+                    try:
+                        self._wakeup_reader.recv(4096)
+                    except BlockingIOError:
+                        pass
+                else:
+                    selector.unregister(key.fileobj)
+                    connection = key.data
+                    if connection.served:
+                        # 长连接上的下一个请求从现在开始计时
+                        connection.deadline = time.monotonic() + _REQUEST_TIMEOUT
+                    self._connections.put(connection)
             while True:
-                client_socket, _ = server_socket.accept()
-                thread = threading.Thread(target=self._handle_client, args=(client_socket,))
-                thread.daemon = True
-                thread.start()
-
-    def _handle_client(self, client_socket: socket.socket) -> None:
-        with client_socket:
-            request_data = b""
-            while True:
-                chunk = client_socket.recv(4096)
-                if not chunk:
+                try:
+                    connection = self._parked.get_nowait()
+                except queue.Empty:
                     break
-                request_data += chunk
-                if b"\r\n\r\n" in request_data:
-                    content_length = self._extract_content_length(request_data)
-                    if content_length == 0:
-                        break
-                    if len(request_data.split(b"\r\n\r\n", 1)[1]) >= content_length:
-                        break
-            if not request_data:
-                return
-            request = HTTPRequest(request_data)
-
-            response = self._dispatch(request)
-            client_socket.sendall(response.to_bytes())
+                selector.register(connection.sock, selectors.EVENT_READ, connection)
+            now = time.monotonic()
+            if now >= next_sweep:
+                next_sweep = now + 1.0
+                expired = [
+                    key for key in selector.get_map().values()
+                    if isinstance(key.data, _Connection) and key.data.deadline <= now
+                ]
+                for key in expired:
+                    selector.unregister(key.fileobj)
+                    key.data.sock.close()
+
+    def _worker_loop(self) -> None:
+        while True:
+            connection = self._connections.get()
+            try:
+                parked = self._handle_client(connection)
+            except Exception:
+                # 单个连接出错不影响工作线程继续服务
+                parked = False
+            if not parked:
+                connection.sock.close()
+
+    def _handle_client(self, connection: _Connection) -> bool:
+        # 返回 True 表示连接已交还监听线程等待下一个请求，不能关闭
+        client_socket = connection.sock
+        try:
+            while True:
+                request_data = self._read_request(client_socket, connection.buffer, connection.deadline)
+                if request_data is None:
+                    return False
+                # 读请求时超时按剩余时间设置，发送响应恢复为固定超时
+                client_socket.settimeout(_REQUEST_TIMEOUT)
+                request = HTTPRequest(request_data)
+                response = self._dispatch(request)
+                connection.served += 1
+                # 响应必须带 Content-Length，客户端才能在同一连接上分辨响应边界
+                keep_alive = (
+                    connection.served < _KEEP_ALIVE_MAX_REQUESTS
+                    and "Content-Length" in response.headers
+                    and self._wants_keep_alive(request)
+                )
+                completed = self._send_response(client_socket, response, _KEEP_ALIVE_HEADER if keep_alive else None)
+                if not keep_alive or not completed:
+                    return False
+                if not connection.buffer:
+                    # 没有已到达的后续请求：连接交还监听线程，工作线程立即去处理其他连接
+                    connection.deadline = time.monotonic() + _KEEP_ALIVE_TIMEOUT
+                    self._parked.put(connection)
+                    self._wakeup_writer.send(b"\0")
+                    return True
+                connection.deadline = time.monotonic() + _REQUEST_TIMEOUT
+        except OSError:
+            # 请求超时或客户端断开
+            return False
+
+    def _send_response(self, client_socket: socket.socket, response: HTTPResponse, keep_alive: Optional[str]) -> bool:
+        _send_buffers(client_socket, response.iter_buffers(keep_alive))
+        if response.file_path is None:
+            return True
+        # 文件正文由内核从页缓存直接写入套接字；文件在 stat 之后变短时发送不足，返回 False 让调用方关闭连接
+        expected = int(response.headers["Content-Length"])
+        with open(response.file_path, "rb") as file_handler:
+            sent = client_socket.sendfile(file_handler, 0, expected)
+        return sent == expected
+
+    def _read_request(self, client_socket: socket.socket, buffer: bytearray, deadline: float) -> Optional[bytes]:
+        # 累积到 bytearray；头部结束位置只在新收到的数据附近查找，Content-Length 只解析一次。
+        # buffer 中可能已有上一个请求之后收到的数据，取走当前请求后剩余部分留给下一个请求
+        header_end = buffer.find(b"\r\n\r\n")
+        content_length = 0
+        if header_end >= 0:
+            content_length = self._extract_content_length(bytes(buffer[:header_end + 4]))
+        while header_end < 0 or len(buffer) - header_end - 4 < content_length:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("request not received before deadline")
+            client_socket.settimeout(remaining)
+            chunk = client_socket.recv(_RECV_BUFFER_SIZE)
+            if not chunk:
+                break
+            buffer.extend(chunk)
+            if header_end < 0:
+                header_end = buffer.find(b"\r\n\r\n", max(0, len(buffer) - len(chunk) - 3))
+                if header_end >= 0:
+                    content_length = self._extract_content_length(bytes(buffer[:header_end + 4]))
+        if not buffer:
+            return None
+        if header_end < 0:
+            end = len(buffer)
+        else:
+            end = min(len(buffer), header_end + 4 + max(content_length, 0))
+        request_data = bytes(buffer[:end])
+        del buffer[:end]
+        return request_data
+
+    def _wants_keep_alive(self, request: HTTPRequest) -> bool:
+        connection = request.headers.get("connection", "").lower()
+        if request.http_version == "HTTP/1.1":
+            return connection != "close"
+        return connection == "keep-alive"
 
     def _extract_content_length(self, request_data: bytes) -> int:
-        header_section = request_data.split(b"\r\n\r\n", 1)[0].decode("utf-8", errors="replace")
-        for line in header_section.split("\r\n"):
-            if line.lower().startswith("content-length:"):
-                value = line.split(":", 1)[1].strip()
-                try:
-                    return int(value)
-                except ValueError:
-                    return 0
-        return 0
+        # 直接在字节上查找，不解码整个头部；首行是请求行，头部行都以 "\r\n" 开头
+        end = request_data.find(b"\r\n\r\n")
+        if end < 0:
+            end = len(request_data)
+        head = request_data[:end].lower()
+        start = head.find(b"\r\ncontent-length:")
+        if start < 0:
+            return 0
+        start += len(b"\r\ncontent-length:")
+        stop = head.find(b"\r\n", start)
+        try:
+            return int(head[start:stop if stop >= 0 else end])
+        except ValueError:
+            return 0
 
     def _dispatch(self, request: HTTPRequest) -> HTTPResponse:
         if request.path.startswith("/static/"):
@@ -242,9 +472,12 @@ class HTTPServer:
         if match is None:
             return self._not_found()
 
-        start_time = time.perf_counter()
+        start_ns = time.perf_counter_ns()
         try:
-            response = match.handler(request, **match.params)
+            if match.params is None:
+                response = match.handler(request)
+            else:
+                response = match.handler(request, **match.params)
         except Exception as exc:
             error_message = f"Internal Server Error: {exc}".encode("utf-8")
             headers = {
@@ -254,25 +487,18 @@ class HTTPServer:
             }
             response = HTTPResponse(500, "Internal Server Error", error_message, headers)
         finally:
-            elapsed = time.perf_counter() - start_time
-            self._record_metric(elapsed)
+            self._record_metric(time.perf_counter_ns() - start_ns)
         return response
 
     def _not_found(self) -> HTTPResponse:
-        body = b"404 Not Found"
-        headers = {
-            "Content-Type": "text/plain; charset=utf-8",
-            "Content-Length": str(len(body)),
-            "Connection": "close",
-        }
-        return HTTPResponse(404, "Not Found", body, headers)
+        return self._resp_404
 
-    def _record_metric(self, elapsed_seconds: float) -> None:
-        if elapsed_seconds < 0:
+    def _record_metric(self, elapsed_ns: int) -> None:
+        if elapsed_ns < 0:
             return
         self._request_counter += 1
-        latency_ms = elapsed_seconds * 1000.0
-        throughput = 0.0 if elapsed_seconds <= 0 else 1.0 / elapsed_seconds
+        latency_ms = elapsed_ns / 1_000_000.0
+        throughput = 1e9 / elapsed_ns if elapsed_ns > 0 else 0.0
         rtt = latency_ms
         self.metrics_model.record_metric(latency_ms, throughput, rtt, self._request_counter)
 
@@ -299,7 +525,12 @@ class HTTPServer:
         # === [修改] 植入特定的加密文章 ===
         # 检查是否已存在，不存在则创建
         encrypted_title = "【机密】只有有缘人能看"
-        if self.post_model.find_post_by_title(encrypted_title) is None:
+        sample_posts: List[Dict[str, str]] = []
+        # 需要检查的标题一次查询取回
+        existing_titles = self.post_model.find_post_ids_by_titles(
+            [encrypted_title] + [post["title"] for post in sample_posts]
+        )
+        if encrypted_title not in existing_titles:
             # 获取用户ID (假设 demo_username 已创建)
             user = self.user_model.get_user_by_username("handsome_slash")
             if user:
@@ -318,9 +549,8 @@ class HTTPServer:
                     is_encrypted=True
                 )
                 print(f"[Demo] Created encrypted post: {encrypted_title}")
-        sample_posts: List[Dict[str, str]] = []
         for post in sample_posts:
-            if self.post_model.find_post_by_title(post["title"]) is not None:
+            if post["title"] in existing_titles:
                 continue
             self.post_model.create_post(
                 author_id=user["id"],
@@ -338,14 +568,8 @@ class HTTPServer:
             )
 
     def _remove_posts_by_titles(self, titles: List[str]) -> None:
-        for title in titles:
-            post = self.post_model.find_post_by_title(title)
-            if post is None:
-                continue
-            post_id = post["id"]
-            self.comment_model.delete_comments_by_post(post_id)
-            self.interaction_model.delete_post_records(post_id)
-            self.post_model.delete_post(post_id)
+        post_ids = self.post_model.find_post_ids_by_titles(titles)
+        self.post_model.delete_posts_with_records(list(post_ids.values()))
 
 
 def create_server(host: str = "127.0.0.1", port: int = 8080) -> HTTPServer:
@@ -1,5 +1,4 @@
-import threading
-import uuid
+import secrets
 from typing import Dict, Optional
 
 from http_types import HTTPRequest
@@ -7,23 +6,19 @@ from http_types import HTTPRequest
 
 class SessionManager:
     def __init__(self) -> None:
+        # 单次 dict 赋值、get、pop 在 GIL 下都是原子操作，会话表不再加锁，鉴权读取不会互相等待
         self._sessions: Dict[str, str] = {}
-        self._lock = threading.Lock()
 
     def create_session(self, username: str) -> str:
-        token = uuid.uuid4().hex
-        with self._lock:
-            self._sessions[token] = username
+        token = secrets.token_hex(16)
+        self._sessions[token] = username
         return token
 
     def get_username(self, session_id: str) -> Optional[str]:
-        with self._lock:
-            return self._sessions.get(session_id)
+        return self._sessions.get(session_id)
 
     def destroy_session(self, session_id: str) -> None:
-        with self._lock:
-            if session_id in self._sessions:
-                del self._sessions[session_id]
+        self._sessions.pop(session_id, None)
 
     def get_current_user(self, request: HTTPRequest) -> Optional[str]:
         cookies = request.get_cookies()
@@ -24,6 +24,63 @@
         }
     }
 
+    function pageQuery(before) {
+        return before ? "?before=" + encodeURIComponent(before) : "";
+    }
+
+    function bindMessageButtons(root) {
+        root.querySelectorAll(".view-message-btn").forEach(function (btn) {
+            btn.addEventListener("click", function () {
+                viewMessage(this.getAttribute("data-message-id"));
+            });
+        });
+        root.querySelectorAll(".delete-message-btn").forEach(function (btn) {
+            btn.addEventListener("click", function () {
+                deleteMessage(this.getAttribute("data-message-id"));
+            });
+        });
+    }
+
+    // 收信箱/已发送按 next_before 游标分页：还有更早的信件时在列表下方显示“加载更多”，点击后把下一页追加到列表末尾
+    function renderLoadMore(nextBefore, loader) {
+        var existing = document.getElementById("mailboxLoadMore");
+        if (existing) existing.remove();
+        if (!nextBefore) return;
+        var button = document.createElement("button");
+        button.type = "button";
+        button.id = "mailboxLoadMore";
+        button.className = "btn btn-sm btn-outline-secondary w-100 mt-3";
+        button.textContent = "加载更多";
+        button.addEventListener("click", function () {
+            button.disabled = true;
+            loader(nextBefore);
+        });
+        document.getElementById("mailboxContent").appendChild(button);
+    }
+
+    function appendMessages(listId, itemsHTML, nextBefore, loader) {
+        var list = document.getElementById(listId);
+        if (!list) return;
+        var holder = document.createElement("div");
+        holder.innerHTML = itemsHTML;
+        bindMessageButtons(holder);
+        while (holder.firstChild) {
+            list.appendChild(holder.firstChild);
+        }
+        renderLoadMore(nextBefore, loader);
+    }
+
+    function showPageError(before, error) {
+        if (before) {
+            var button = document.getElementById("mailboxLoadMore");
+            if (button) button.disabled = false;
+            alert(error.message);
+            return;
+        }
+        document.getElementById("mailboxContent").innerHTML =
+            '<div class="alert alert-danger" role="alert">' + escapeHTML(error.message) + "</div>";
+    }
+
     function loadView(view) {
         currentView = view;
         var content = document.getElementById("mailboxContent");
@@ -49,8 +106,8 @@
         }
     }
 
-    function loadInbox() {
-        fetch("/api/messages/inbox")
+    function loadInbox(before) {
+        fetch("/api/messages/inbox" + pageQuery(before))
             .then(function (response) {
                 if (!response.ok) throw new Error("加载失败");
                 return response.json();
@@ -60,18 +117,18 @@
                     throw new Error(data.message || "加载失败");
                 }
                 var messages = data.messages || [];
+                var items = "";
                 var html = '<h3 class="h5 mb-3"><i class="fa-solid fa-inbox me-2"></i>收信箱</h3>';
                 if (messages.length === 0) {
                     html += '<div class="alert alert-light" role="alert">收信箱为空</div>';
                 } else {
-                    html += '<div class="list-group" id="inboxMessages">';
                     messages.forEach(function (msg) {
                         var sender = msg.sender || {};
                         var displayName = escapeHTML(sender.display_name || sender.username || "未知");
                         var preview = escapeHTML((msg.content || "").substring(0, 50));
                         var time = formatTimestamp(msg.created_at);
                         var msgId = escapeHTML(msg.id);
-                        html += '<div class="list-group-item" data-message-id="' + msgId + '">' +
+                        items += '<div class="list-group-item" data-message-id="' + msgId + '">' +
                             '<div class="d-flex justify-content-between align-items-start">' +
                             '<div class="flex-grow-1">' +
                             '<h6 class="mb-1">' + displayName + '</h6>' +
@@ -85,25 +142,23 @@
                             '</div>' +
                             '</div>';
                     });
-                    html += '</div>';
-                    document.getElementById("mailboxContent").innerHTML = html;
-                    document.querySelectorAll(".view-message-btn").forEach(function (btn) {
-                        btn.addEventListener("click", function () {
-                            viewMessage(this.getAttribute("data-message-id"));
-                        });
-                    });
-                    document.querySelectorAll(".delete-message-btn").forEach(function (btn) {
-                        btn.addEventListener("click", function () {
-                            deleteMessage(this.getAttribute("data-message-id"));
-                        });
-                    });
+                    if (before) {
+                        appendMessages("inboxMessages", items, data.next_before, loadInbox);
+                        return;
+                    }
+                    html += '<div class="list-group" id="inboxMessages">' + items + '</div>';
+                }
+                if (before) {
+                    appendMessages("inboxMessages", "", null, loadInbox);
                     return;
                 }
-                document.getElementById("mailboxContent").innerHTML = html;
+                var content = document.getElementById("mailboxContent");
+                content.innerHTML = html;
+                bindMessageButtons(content);
+                renderLoadMore(data.next_before, loadInbox);
             })
             .catch(function (error) {
-                document.getElementById("mailboxContent").innerHTML =
-                    '<div class="alert alert-danger" role="alert">' + escapeHTML(error.message) + "</div>";
+                showPageError(before, error);
             });
     }
 
@@ -165,8 +220,8 @@
             });
     }
 
-    function loadSent() {
-        fetch("/api/messages/sent")
+    function loadSent(before) {
+        fetch("/api/messages/sent" + pageQuery(before))
             .then(function (response) {
                 if (!response.ok) throw new Error("加载失败");
                 return response.json();
@@ -176,18 +231,18 @@
                     throw new Error(data.message || "加载失败");
                 }
                 var messages = data.messages || [];
+                var items = "";
                 var html = '<h3 class="h5 mb-3"><i class="fa-solid fa-paper-plane me-2"></i>已发送</h3>';
                 if (messages.length === 0) {
                     html += '<div class="alert alert-light" role="alert">暂无已发送的信件</div>';
                 } else {
-                    html += '<div class="list-group" id="sentMessages">';
                     messages.forEach(function (msg) {
                         var receiver = msg.receiver || {};
                         var displayName = escapeHTML(receiver.display_name || receiver.username || "未知");
                         var preview = escapeHTML((msg.content || "").substring(0, 50));
                         var time = formatTimestamp(msg.created_at);
                         var msgId = escapeHTML(msg.id);
-                        html += '<div class="list-group-item" data-message-id="' + msgId + '">' +
+                        items += '<div class="list-group-item" data-message-id="' + msgId + '">' +
                             '<div class="d-flex justify-content-between align-items-start">' +
                             '<div class="flex-grow-1">' +
                             '<h6 class="mb-1">收信人：' + displayName + '</h6>' +
@@ -201,25 +256,23 @@
                             '</div>' +
                             '</div>';
                     });
-                    html += '</div>';
-                    document.getElementById("mailboxContent").innerHTML = html;
-                    document.querySelectorAll(".view-message-btn").forEach(function (btn) {
-                        btn.addEventListener("click", function () {
-                            viewMessage(this.getAttribute("data-message-id"));
-                        });
-                    });
-                    document.querySelectorAll(".delete-message-btn").forEach(function (btn) {
-                        btn.addEventListener("click", function () {
-                            deleteMessage(this.getAttribute("data-message-id"));
-                        });
-                    });
+                    if (before) {
+                        appendMessages("sentMessages", items, data.next_before, loadSent);
+                        return;
+                    }
+                    html += '<div class="list-group" id="sentMessages">' + items + '</div>';
+                }
+                if (before) {
+                    appendMessages("sentMessages", "", null, loadSent);
                     return;
                 }
-                document.getElementById("mailboxContent").innerHTML = html;
+                var content = document.getElementById("mailboxContent");
+                content.innerHTML = html;
+                bindMessageButtons(content);
+                renderLoadMore(data.next_before, loadSent);
             })
             .catch(function (error) {
-                document.getElementById("mailboxContent").innerHTML =
-                    '<div class="alert alert-danger" role="alert">' + escapeHTML(error.message) + "</div>";
+                showPageError(before, error);
             });
     }
 
@@ -4,6 +4,8 @@
     var messagePollInterval = null;
     var conversationList = null;
     var conversationView = null;
+    // 会话列表按 next_before 游标分页加载，已加载的联系人按最近消息时间排列
+    var conversationContacts = [];
 
     function escapeHTML(text) {
         if (typeof text !== "string") {
@@ -200,8 +202,8 @@
             });
     }
 
-    function refreshConversationList() {
-        fetch("/api/messages")
+    function refreshConversationList(before) {
+        fetch("/api/messages" + (before ? "?before=" + encodeURIComponent(before) : ""))
             .then(function (response) {
                 if (!response.ok) {
                     return null;
@@ -210,19 +212,26 @@
             })
             .then(function (data) {
                 if (data && data.success && Array.isArray(data.messages)) {
+                    if (!before) {
+                        conversationContacts = [];
+                    }
                     var contacts = {};
+                    conversationContacts.forEach(function (contact) {
+                        contacts[contact.username] = true;
+                    });
                     data.messages.forEach(function (message) {
                         var other = message.sender_id === currentUserId ? message.receiver : message.sender;
                         if (other && other.username) {
                             if (!contacts[other.username]) {
-                                contacts[other.username] = {
+                                contacts[other.username] = true;
+                                conversationContacts.push({
                                     username: other.username,
                                     display_name: other.display_name || other.username,
-                                };
+                                });
                             }
                         }
                     });
-                    var contactsList = Object.values(contacts);
+                    var contactsList = conversationContacts;
                     if (contactsList.length === 0) {
                         conversationList.innerHTML = '<div class="alert alert-light border-dashed text-muted" role="alert">暂无私信联系人，点击"新建私信"开始对话。</div>';
                     } else {
@@ -241,8 +250,20 @@
                                 '</div>' +
                                 '</a>';
                         }).join("");
-                        conversationList.innerHTML = '<div class="list-group list-group-flush">' + items + "</div>";
+                        var loadMore = "";
+                        if (data.next_before) {
+                            loadMore = '<button type="button" class="btn btn-sm btn-outline-secondary w-100 mt-2" data-role="load-more-conversations" data-before="' +
+                                escapeHTML(data.next_before) + '">加载更多</button>';
+                        }
+                        conversationList.innerHTML = '<div class="list-group list-group-flush">' + items + "</div>" + loadMore;
                         attachConversationListeners();
+                        var loadMoreButton = conversationList.querySelector("[data-role='load-more-conversations']");
+                        if (loadMoreButton) {
+                            loadMoreButton.addEventListener("click", function () {
+                                loadMoreButton.disabled = true;
+                                refreshConversationList(loadMoreButton.getAttribute("data-before"));
+                            });
+                        }
                     }
                 }
             })
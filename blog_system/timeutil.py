@@ -0,0 +1,28 @@
+import time
+from typing import Tuple
+
+
+# (整秒, 格式化结果)；整个元组一次赋值替换，多线程读到的总是一致的一对
+_cached_second: Tuple[int, str] = (-1, "")
+
+
+def _format_second(second: int) -> str:
+    global _cached_second
+    cached = _cached_second
+    if cached[0] == second:
+        return cached[1]
+    text = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+    _cached_second = (second, text)
+    return text
+
+
+def utc_now_iso_seconds() -> str:
+    # 秒级精度的 UTC ISO 时间串，同一秒内的调用直接复用上次格式化的结果。
+    # 只用于不依赖先后顺序的时间戳（指标、点赞/收藏记录）；消息、文章等需要排序或作为版本号的仍用微秒精度
+    return _format_second(time.time_ns() // 1_000_000_000)
+
+
+def utc_now_iso() -> str:
+    # 微秒精度的 UTC ISO 时间串（始终带 6 位小数），秒级部分与上面共用缓存，只拼接微秒
+    second, nanos = divmod(time.time_ns(), 1_000_000_000)
+    return f"{_format_second(second)}.{nanos // 1000:06d}"